@@ -0,0 +1,111 @@
+import hmac
+import io
+import pstats
+import tempfile
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from sqlmodel import Session
+
+from app.core import profiling
+from app.core.config import settings
+from app.db import crud
+from app.db.session import engine, get_session
+from app.services import snapshot
+
+SPOOL_BYTES = 64 << 20  # bundles larger than this go through a temp file
+
+
+def require_admin(authorization: Optional[str] = Header(default=None)):
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="admin API disabled: set ADMIN_TOKEN")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+# can replace any job's JD, skills and bank: main.py only mounts it when ADMIN_TOKEN is set
+snapshot_router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    return {"items": profiling.list_profiles(limit)}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|txt)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    top: int = Query(60, ge=1, le=1000),
+):
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    if format == "pstats":
+        # open with `python -m pstats`, snakeviz, or convert for speedscope/flamegraphs
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    buf = io.StringIO()
+    pstats.Stats(path, stream=buf).strip_dirs().sort_stats(sort).print_stats(top)
+    return PlainTextResponse(buf.getvalue())
+
+
+def _read_chunks(f, size: int = 1 << 20):
+    try:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        f.close()
+
+
+@snapshot_router.get("/snapshot")
+def export_snapshot(
+    job_ids: Optional[str] = Query(None, description="comma-separated ids; all jobs if omitted"),
+    fp16: bool = False,
+    session: Session = Depends(get_session),
+):
+    """Download jobs as a snapshot bundle (see services/snapshot.py)."""
+    try:
+        ids = [int(x) for x in job_ids.split(",") if x.strip()] if job_ids else crud.all_job_ids(session)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="job_ids must be comma-separated integers")
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        snapshot.export_jobs(session, ids, spool, dtype="float16" if fp16 else "float32")
+    except snapshot.SnapshotError as e:
+        spool.close()
+        raise HTTPException(status_code=404, detail=str(e))
+    spool.seek(0)
+    return StreamingResponse(
+        _read_chunks(spool),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="jobs.snap"'},
+    )
+
+
+def _import(f, overwrite: bool):
+    with Session(engine) as session:
+        return snapshot.import_bundle(session, f, overwrite=overwrite)
+
+
+@snapshot_router.post("/snapshot")
+async def import_snapshot(request: Request, overwrite: bool = False):
+    """Load a bundle sent as the raw request body (application/octet-stream)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        items = await run_in_threadpool(_import, spool, overwrite)
+    except snapshot.SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        spool.close()
+    return {"items": items}
@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session
 from app.schemas.common import JDIn
 from app.db.session import get_session
 from app.db import crud
-from app.services.lc import index_job_description
+from app.services.lc import index_job_description, reindex_job_description
+from app.services import context, leaderboard, question_bank
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/ingest", tags=["ingest"])
+router = APIRouter(prefix="/ingest", tags=["ingest"], route_class=ProfiledRoute)
 
 @router.post("/jd")
-def ingest_jd(payload: JDIn, session: Session = Depends(get_session)):
+def ingest_jd(payload: JDIn, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
     if not payload.jd_text.strip():
         raise HTTPException(status_code=400, detail="jd_text is empty")
     try:
         job = crud.create_job(session, payload.title, payload.jd_text)
         index_job_description(job.id, payload.jd_text)
+        # pre-generate quiz questions so /quiz/start doesn't wait on the LLM
+        background_tasks.add_task(question_bank.fill_bank, job.id)
         print(f"Returning job_id={job.id}")
 
         # embeddings
@@ -22,3 +26,30 @@ def ingest_jd(payload: JDIn, session: Session = Depends(get_session)):
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/jd/{job_id}")
+def update_jd(job_id: int, payload: JDIn, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+    if not payload.jd_text.strip():
+        raise HTTPException(status_code=400, detail="jd_text is empty")
+    if not crud.get_job(session, job_id, lazy_text=True):
+        raise HTTPException(status_code=404, detail="job not found")
+    # reindex before saving the JD: if it fails, the job keeps its old JD and index
+    try:
+        diff = reindex_job_description(job_id, payload.jd_text)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"reindex failed, JD not updated: {e}")
+    changed = bool(diff["added"] or diff["removed"])
+    if changed:
+        # before the jd_version bump: a fill for the old JD that adds after this clear sees the bump
+        crud.clear_bank(session, job_id)
+    job = crud.update_job(session, job_id, payload.title, payload.jd_text)
+
+    if changed:
+        # everything derived from the chunks is stale now; quizzes already taken keep their questions
+        crud.set_job_skills(session, job.id, None)  # bumps skills_version -> /match results miss
+        context.clear_job(job.id)  # this process; other workers expire it after context_cache_ttl_s
+        leaderboard.clear_job(session, job.id)
+        background_tasks.add_task(question_bank.fill_bank, job.id)
+    return {"job_id": job.id, "changed": changed, **diff}
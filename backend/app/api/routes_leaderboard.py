@@ -0,0 +1,61 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from app.db.session import get_session
+from app.db import crud
+from app.services import leaderboard
+from app.core.profiling import ProfiledRoute
+
+router = APIRouter(prefix="/jobs/{job_id}/leaderboard", tags=["leaderboard"], route_class=ProfiledRoute)
+
+METRIC = Query("combined", pattern="^(combined|cv|quiz)$")
+
+def _job(session: Session, job_id: int):
+    if not crud.get_job(session, job_id, lazy_text=True):
+        raise HTTPException(status_code=404, detail="job not found")
+
+@router.get("")
+def top(
+    job_id: int,
+    metric: str = METRIC,
+    k: int = Query(10, ge=1, le=500),
+    session: Session = Depends(get_session),
+):
+    _job(session, job_id)
+    return {"job_id": job_id, "metric": metric, "items": leaderboard.top(session, job_id, metric, k)}
+
+@router.get("/rank")
+def rank(
+    job_id: int,
+    metric: str = METRIC,
+    resume_id: Optional[int] = None,
+    quiz_id: Optional[int] = None,
+    score: Optional[float] = Query(None, ge=0, le=100),
+    session: Session = Depends(get_session),
+):
+    """Rank of a recorded candidate (resume_id, or quiz_id for quiz-only matches), or of a bare score."""
+    _job(session, job_id)
+    if score is None:
+        if resume_id is None and quiz_id is None:
+            raise HTTPException(status_code=400, detail="give resume_id or quiz_id, or score")
+        entry = crud.get_leaderboard_entry(session, job_id, resume_id or 0, quiz_id or 0)
+        if entry is None and quiz_id and not resume_id:
+            entry = crud.leaderboard_entry_with_quiz(session, job_id, quiz_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="candidate has no match result for this job")
+        score = getattr(entry, crud.LEADERBOARD_COLUMNS[metric])
+        if score is None:
+            raise HTTPException(status_code=404, detail=f"candidate has no {metric} score")
+    return {"job_id": job_id, "metric": metric, **leaderboard.rank(session, job_id, metric, score)}
+
+@router.get("/histogram")
+def histogram(
+    job_id: int,
+    metric: str = METRIC,
+    bins: int = Query(10, ge=1, le=100),
+    session: Session = Depends(get_session),
+):
+    _job(session, job_id)
+    out = leaderboard.histogram(session, job_id, metric, bins)
+    out["quantiles"] = leaderboard.quantiles(session, job_id, metric)
+    return {"job_id": job_id, **out}
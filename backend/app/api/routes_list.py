@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from app.db.session import get_session
+from app.db import crud
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.core.profiling import ProfiledRoute
+
+router = APIRouter(tags=["list"], route_class=ProfiledRoute)
+
+def _after(cursor: Optional[str]):
+    try:
+        return decode_cursor(cursor)
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+def _page(rows, limit: int, fields: tuple[str, ...]) -> dict:
+    # we fetch limit+1 rows to know whether another page exists
+    more = len(rows) > limit
+    rows = rows[:limit]
+    items = [dict(zip(fields, r)) for r in rows]
+    nxt = encode_cursor(rows[-1].created_at, rows[-1].id) if more and rows else None
+    return {"items": items, "next_cursor": nxt}
+
+@router.get("/jobs")
+def list_jobs(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    title: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+):
+    rows = crud.list_jobs(session, limit + 1, _after(cursor), title, created_after, created_before)
+    return _page(rows, limit, ("id", "title", "created_at", "skills_version"))
+
+@router.get("/resumes")
+def list_resumes(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+):
+    rows = crud.list_resumes(session, limit + 1, _after(cursor), created_after, created_before)
+    return _page(rows, limit, ("id", "created_at", "version"))
+
+@router.get("/quizzes")
+def list_quizzes(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    job_id: Optional[int] = None,
+    graded: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+):
+    rows = crud.list_quizzes(session, limit + 1, _after(cursor), job_id, graded, created_after, created_before)
+    return _page(rows, limit, ("id", "job_id", "created_at", "grades_version"))
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlmodel import Session
 from app.schemas.common import MatchIn
 from app.db.session import get_session
 from app.db import crud
-from app.services.aligner import extract_jd_skills_langchain, score_resume_against_skills
+from app.core.metrics import metrics
+from app.core.config import settings
+from app.services import leaderboard, resilience, scheduler
+from app.services.aligner import get_job_skills, score_resume_against_skills
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter(tags=["match"])
+router = APIRouter(tags=["match"], route_class=ProfiledRoute)
 
 def fit_badge(cv_score: float | None, quiz_score: float | None):
     if cv_score is None and quiz_score is None:
@@ -24,36 +30,45 @@ def fit_badge(cv_score: float | None, quiz_score: float | None):
         return ("quiz_only_strong", "✅ Strong quiz performance.") if quiz_score >= 70 else ("quiz_only_gaps", "⚠️ Improve interview answers.")
     return None, ""
 
-@router.post("/match")
-def match(req: MatchIn, session: Session = Depends(get_session)):
-    job = crud.get_job(session, req.job_id)
+def _load(session: Session, req: MatchIn):
+    # text columns stay deferred: a materialized hit never needs them
+    job = crud.get_job(session, req.job_id, lazy_text=True)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
+    resume = None
+    if req.resume_id is not None:
+        resume = crud.get_resume(session, req.resume_id, lazy_text=True)
+        if not resume:
+            raise HTTPException(status_code=404, detail="resume not found")
+    quiz = None
+    if req.quiz_id is not None:
+        quiz = crud.get_quiz(session, req.quiz_id)
+        if not quiz:
+            raise HTTPException(status_code=404, detail="quiz not found")
+    return job, resume, quiz
 
-    # LangChain-based skill extraction
-    skills = extract_jd_skills_langchain(job.id)
+def _compute(session: Session, job, resume, quiz) -> dict:
+    # LangChain-based skill extraction (cached on the job)
+    with scheduler.priority("grade"):
+        skills = get_job_skills(session, job.id)
     if not skills:
+        # placeholder scores must not be stored or ranked: report it as a fallback
+        resilience.note_fallback("skills", "empty")
         skills = [{"skill": "communication", "importance": 3, "must_have": False}]
 
     result: dict = {"cv_match": None, "quiz_match": None, "combined": None, "badge": None, "message": ""}
 
     # CV scoring
     cv_score = None
-    if req.resume_id is not None:
-        resume = crud.get_resume(session, req.resume_id)
-        if not resume:
-            raise HTTPException(status_code=404, detail="resume not found")
+    if resume is not None:
         cv_res = score_resume_against_skills(resume.text, skills)
         result["cv_match"] = cv_res
         cv_score = cv_res["score"]
 
     # Quiz score (from DB)
     quiz_score = None
-    if req.quiz_id is not None:
-        quiz = crud.get_quiz(session, req.quiz_id)
-        if not quiz:
-            raise HTTPException(status_code=404, detail="quiz not found")
-        quiz_score = crud.quiz_overall(session, req.quiz_id)
+    if quiz is not None:
+        quiz_score = crud.quiz_overall(session, quiz.id)
         result["quiz_match"] = {"score": quiz_score}
 
     # Combined + badge
@@ -67,3 +82,52 @@ def match(req: MatchIn, session: Session = Depends(get_session)):
         result["recommend"] = {"top_cv_gaps": result["cv_match"]["gaps"][:3]}
 
     return result
+
+def _materialized(session: Session, job, resume, quiz) -> tuple[dict, str | None]:
+    """Serve the stored payload for the current versions, or compute and store it."""
+    hit = crud.get_match_result(session, crud.match_key(job, resume, quiz))
+    if hit:
+        metrics.incr("match.cache_hit")
+        return json.loads(hit.payload), hit.etag
+
+    metrics.incr("match.cache_miss")
+    with resilience.track() as fallbacks:
+        result = _compute(session, job, resume, quiz)
+    result["degraded"] = bool(fallbacks)
+    if fallbacks:
+        # keyword or placeholder skills: neither stored nor ranked, the next request recomputes
+        metrics.incr("match.degraded")
+        return result, None
+    session.refresh(job)  # skills may have just been extracted (version bump)
+    row = crud.save_match_result(session, crud.match_key(job, resume, quiz), result)
+    if settings.leaderboard_enabled:
+        leaderboard.record(session, job.id, resume.id if resume else 0, quiz.id if quiz else 0, result)
+    return result, row.etag
+
+@router.post("/match")
+def match(req: MatchIn, session: Session = Depends(get_session)):
+    result, _ = _materialized(session, *_load(session, req))
+    return result
+
+@router.get("/match")
+def match_get(
+    response: Response,
+    job_id: int,
+    resume_id: Optional[int] = None,
+    quiz_id: Optional[int] = None,
+    if_none_match: Optional[str] = Header(default=None),
+    session: Session = Depends(get_session),
+):
+    """Polling variant: answers 304 when If-None-Match still matches the current versions."""
+    job, resume, quiz = _load(session, MatchIn(job_id=job_id, resume_id=resume_id, quiz_id=quiz_id))
+    if if_none_match:
+        key = crud.match_key(job, resume, quiz)
+        etag = crud.match_etag(key)
+        if etag in [t.strip() for t in if_none_match.split(",")] and crud.get_match_result(session, key):
+            metrics.incr("match.not_modified")
+            return Response(status_code=304, headers={"ETag": etag})
+
+    result, etag = _materialized(session, job, resume, quiz)
+    if etag:
+        response.headers["ETag"] = etag
+    return result
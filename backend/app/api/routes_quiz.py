@@ -1,25 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session
 from app.db.session import get_session
 from app.db import crud
+from app.core.config import settings
 from app.schemas.common import QuizStartIn, QuizStartOut, QuizGradeIn, QuizGradeOut
 from app.services.quiz import make_questions, grade_many
+from app.services import question_bank, resilience, scheduler
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/quiz", tags=["quiz"])
+router = APIRouter(prefix="/quiz", tags=["quiz"], route_class=ProfiledRoute)
+
+def _stored_grade(a) -> dict | None:
+    if a.score_pct is None:
+        return None
+    return {
+        "accuracy": a.accuracy or 0,
+        "completeness": a.completeness or 0,
+        "communication": a.communication or 0,
+        "score_pct": float(a.score_pct),
+        "tip": a.tip or "",
+    }
 
 @router.post("/start", response_model=QuizStartOut)
-def quiz_start(req: QuizStartIn, session: Session = Depends(get_session)):
-    job = crud.get_job(session, req.job_id)
+def quiz_start(req: QuizStartIn, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+    job = crud.get_job(session, req.job_id, lazy_text=True)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
 
+    # Serve from the pre-generated bank; generate live only if it can't cover n yet
+    qs = question_bank.draw(session, job.id, req.n)
+    with resilience.track() as fallbacks:
+        if not qs:
+            with scheduler.priority("interactive"):
+                qs = make_questions(job.id, n=req.n, session=session)  # may raise Overloaded -> 429
+    if question_bank.needs_refill(session, job.id):
+        background_tasks.add_task(question_bank.fill_bank, job.id, max(settings.question_bank_size, 4 * req.n))
+    # created only once questions exist, so a 429 leaves no empty quiz behind
     quiz = crud.create_quiz(session, job.id)
-    qs = make_questions(job.id, n=req.n, session=session)
     rows = crud.add_questions(session, quiz.id, qs)
 
     return {
         "quiz_id": quiz.id,
         "questions": [{"id": r.id, "idx": r.idx, "text": r.text} for r in rows],
+        "degraded": bool(fallbacks),
     }
 
 
@@ -29,35 +52,57 @@ def quiz_grade(req: QuizGradeIn, session: Session = Depends(get_session)):
     if not quiz:
         raise HTTPException(status_code=404, detail="quiz not found")
 
-    # Persist raw answers first (existing behavior)
+    # Persist answers as versions; unchanged answers keep their stored grade
     answers_map = {a["question_id"]: a["text"] for a in req.answers}
-    crud.add_answers(session, req.quiz_id, answers_map)
+    current, changed = crud.save_answer_versions(session, req.quiz_id, answers_map)
 
     # Load questions in creation order
     questions = crud.list_questions(session, req.quiz_id)
     if not questions:
         raise HTTPException(status_code=400, detail="no questions for this quiz")
 
+    # A partial resubmission only sends changed answers; the rest keep their
+    # latest stored version (and its grade)
+    missing = [q.id for q in questions if q.id not in current]
+    if missing:
+        stored = crud.latest_answers(session, req.quiz_id)
+        current.update({qid: stored[qid] for qid in missing if qid in stored})
+
     # Build ordered (question_text, answer_text) pairs
-    qas = [(q.text, answers_map.get(q.id, "")) for q in questions]
+    qas = [(q.text, current[q.id].text if q.id in current else "") for q in questions]
+    prior = [
+        _stored_grade(current[q.id]) if q.id in current and q.id not in changed else None
+        for q in questions
+    ]
 
     # Batch grade & summarize (returns overall, feedback, quiz_match, per)
-    summary = grade_many(quiz.job_id, qas, session)
+    # on 429 nothing below runs; answers are saved ungraded and regraded on retry
+    with scheduler.priority("grade"), resilience.track() as fallbacks:
+        summary = grade_many(quiz.job_id, qas, session, prior=prior)
 
-    # Persist per-question grades
+    # Persist per-question grades for answers that were (re)graded this time
+    regraded = False
     for i, q in enumerate(questions):
+        if q.id not in current or prior[i] is not None:
+            continue
         per = summary["per"][i]
-        a_row = crud.get_answer_for_question(session, req.quiz_id, q.id)
-        if a_row:
-            crud.update_answer_grade(
-                session,
-                a_row.id,
-                per["accuracy"],
-                per["completeness"],
-                per["communication"],
-                per["score_pct"],
-                per.get("tip", ""),
-            )
+        if per.get("source") == "heuristic":
+            continue  # stays ungraded, so the next submit asks the LLM again
+        regraded = True
+        crud.update_answer_grade(
+            session,
+            current[q.id].id,
+            per["accuracy"],
+            per["completeness"],
+            per["communication"],
+            per["score_pct"],
+            per.get("tip", ""),
+        )
+
+    if changed or regraded:
+        # new answer versions change the quiz score even when they are only graded
+        # heuristically (and left ungraded), so materialized /match results must miss
+        crud.bump_grades_version(session, req.quiz_id)
 
     # Use computed overall (avoids extra DB read)
     overall = summary["overall"]
@@ -74,5 +119,6 @@ def quiz_grade(req: QuizGradeIn, session: Session = Depends(get_session)):
             for i, q in enumerate(questions)
         ],
         "quiz_match": summary.get("quiz_match"),
+        "degraded": bool(fallbacks),
     }
     return resp
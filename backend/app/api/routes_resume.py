@@ -4,8 +4,9 @@ from app.schemas.common import ResumeIn
 from app.db.session import get_session
 from app.db import crud
 from app.utils.file import parse_file
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/ingest", tags=["ingest"])
+router = APIRouter(prefix="/ingest", tags=["ingest"], route_class=ProfiledRoute)
 
 @router.post("/resume")
 def ingest_resume(payload: ResumeIn, session: Session = Depends(get_session)):
@@ -15,6 +16,17 @@ def ingest_resume(payload: ResumeIn, session: Session = Depends(get_session)):
     resume = crud.create_resume(session, text)
     return {"resume_id": resume.id}
 
+@router.put("/resume/{resume_id}")
+def update_resume(resume_id: int, payload: ResumeIn, session: Session = Depends(get_session)):
+    text = (payload.text or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="resume text is empty")
+    # a changed text bumps the resume version, so materialized /match results miss
+    resume = crud.update_resume_text(session, resume_id, text)
+    if not resume:
+        raise HTTPException(status_code=404, detail="resume not found")
+    return {"resume_id": resume.id, "version": resume.version}
+
 @router.post("/resume-file")
 async def ingest_resume_file(file: UploadFile = File(...), session: Session = Depends(get_session)):
     name = file.filename or "upload"
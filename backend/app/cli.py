@@ -0,0 +1,426 @@
+# app/cli.py
+"""
+Offline commands that don't need the HTTP server.
+
+    cd backend
+    python -m app.cli score --out scores.csv                         # every resume x every job in app.db
+    python -m app.cli score --resumes ./cvs --jobs ./jds --out scores.parquet --workers 8
+    python -m app.cli export --out jobs.snap                         # every job in app.db
+    python -m app.cli import jobs.snap                               # on the new replica
+
+score
+  Jobs and resumes come from the DB (default) or from a directory of
+  .pdf/.docx/.txt files parsed with utils/file.py. Job skills are loaded from
+  the cache on the Job row (or a <out>.skills.json sidecar for JD files) and
+  extracted with the LLM only when missing (--no-extract skips those jobs).
+
+  Resumes are streamed in batches through a process pool: each worker loads
+  or parses its batch and scores it against every job, so throughput scales
+  with --workers. Rows are appended to CSV (or Parquet part files if the
+  output ends in .parquet; needs pyarrow) and every flush is recorded in
+  <out>.ckpt. An interrupted run picks up after the last checkpoint; any
+  rows written after it are truncated first. Use --fresh to start over.
+
+export / import
+  Pack jobs (JD, skills, question bank, chunk texts and their vectors) into a
+  binary bundle (services/snapshot.py) and load it on another node. Vectors
+  go straight into the store, so import needs neither re-embedding nor the
+  LLM. Job ids are kept; a job that exists with a different JD is skipped
+  unless --overwrite.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.db.session import engine, init_db
+
+FILE_TYPES = {".pdf", ".docx", ".txt"}
+COLUMNS = ["resume", "job", "job_title", "score", "matched", "total_skills", "gaps"]
+
+
+# ---------------- sources ----------------
+
+def _files(root: str) -> List[Path]:
+    base = Path(root)
+    if not base.is_dir():
+        raise SystemExit(f"not a directory: {root}")
+    return sorted(p for p in base.rglob("*") if p.is_file() and p.suffix.lower() in FILE_TYPES)
+
+
+def _read_file(path: Path) -> str:
+    from app.utils.file import parse_file
+    return parse_file(path.name, path.read_bytes()).strip()
+
+
+def _resume_keys(source: str, batch: int) -> Iterator[List[str]]:
+    """Resume keys in a stable order, in batches; never holds resume text."""
+    if source != "db":
+        files = _files(source)
+        for i in range(0, len(files), batch):
+            yield [str(p) for p in files[i:i + batch]]
+        return
+    from app.db.models import Resume
+    last = 0
+    with Session(engine) as session:
+        while True:
+            ids = session.exec(select(Resume.id).where(Resume.id > last).order_by(Resume.id).limit(batch)).all()
+            if not ids:
+                return
+            last = ids[-1]
+            yield [f"resume:{i}" for i in ids]
+
+
+def _load_jobs(source: str, extract: bool, skills_cache: str) -> List[Dict]:
+    from app.services import resilience
+    from app.services.aligner import extract_skills_from_text, get_job_skills
+
+    jobs = []
+    if source == "db":
+        from app.db import crud
+        from app.db.models import Job
+        with Session(engine) as session:
+            rows = session.exec(select(Job.id, Job.title).order_by(Job.id)).all()
+            for job_id, title in rows:
+                skills = crud.get_job_skills(session, job_id)
+                if skills is None and extract:
+                    print(f"🧠 extracting skills for job {job_id}", file=sys.stderr)
+                    with resilience.track() as fallbacks:
+                        skills = get_job_skills(session, job_id)
+                    if fallbacks:
+                        print(f"⚠️ job {job_id}: LLM unavailable, using keyword skills (not cached)", file=sys.stderr)
+                if not skills:
+                    print(f"⚠️ job {job_id}: no skills, skipped", file=sys.stderr)
+                    continue
+                jobs.append({"key": f"job:{job_id}", "title": title, "skills": skills})
+        return jobs
+
+    cache = {}
+    if os.path.exists(skills_cache):
+        with open(skills_cache) as f:
+            cache = json.load(f)
+    for path in _files(source):
+        key = str(path)
+        skills = cache.get(key)
+        if skills is None and extract:
+            print(f"🧠 extracting skills for {path.name}", file=sys.stderr)
+            with resilience.track() as fallbacks:
+                skills = extract_skills_from_text(_read_file(path))
+            if fallbacks:
+                print(f"⚠️ {path.name}: LLM unavailable, using keyword skills (not cached)", file=sys.stderr)
+            else:
+                cache[key] = skills
+                with open(skills_cache, "w") as f:
+                    json.dump(cache, f)
+        if not skills:
+            print(f"⚠️ {path.name}: no skills, skipped", file=sys.stderr)
+            continue
+        jobs.append({"key": key, "title": path.stem, "skills": skills})
+    return jobs
+
+
+# ---------------- workers ----------------
+
+_JOBS: List[Dict] = []
+
+
+def _init_worker(jobs: List[Dict]):
+    global _JOBS
+    _JOBS = jobs
+    # a forked child must not reuse the parent's pooled SQLite connections
+    engine.dispose(close=False)
+
+
+def _score_batch(keys: List[str]) -> Tuple[List[str], List[list]]:
+    from app.services.aligner import normalize_resume, score_resume_against_skills
+
+    if keys[0].startswith("resume:"):
+        from app.db.models import Resume
+        ids = [int(k.split(":", 1)[1]) for k in keys]
+        with Session(engine) as session:
+            texts = dict(session.exec(select(Resume.id, Resume.text).where(Resume.id.in_(ids))).all())
+        docs = [(k, texts.get(i) or "") for k, i in zip(keys, ids)]
+    else:
+        docs = [(k, _read_file(Path(k))) for k in keys]
+
+    rows = []
+    for key, text in docs:
+        if not text:
+            continue
+        body = normalize_resume(text)  # once per resume, not once per job
+        for job in _JOBS:
+            r = score_resume_against_skills(body, job["skills"], normalized=True)
+            rows.append([key, job["key"], job["title"], r["score"], r["matched"], r["total_skills"], ";".join(r["gaps"])])
+    return keys, rows
+
+
+# ---------------- output + checkpoint ----------------
+
+class CsvSink:
+    def __init__(self, path: str):
+        self.path = path
+
+    def position(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def truncate(self, pos: int):
+        if os.path.exists(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(pos)
+
+    def write(self, rows: List[list]) -> int:
+        new = self.position() == 0
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        if new:
+            w.writerow(COLUMNS)
+        w.writerows(rows)
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+        return self.position()
+
+
+class ParquetSink:
+    """A directory of part files; the checkpoint position is the number of parts."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow), or write .csv")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _parts(self) -> List[str]:
+        return sorted(f for f in os.listdir(self.path) if f.startswith("part-") and f.endswith(".parquet"))
+
+    def position(self) -> int:
+        return len(self._parts())
+
+    def truncate(self, pos: int):
+        for name in self._parts()[pos:]:
+            os.remove(os.path.join(self.path, name))
+
+    def write(self, rows: List[list]) -> int:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pos = self.position()
+        table = pa.Table.from_pydict({c: [r[i] for r in rows] for i, c in enumerate(COLUMNS)})
+        tmp = os.path.join(self.path, f".part-{pos:05d}.tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, os.path.join(self.path, f"part-{pos:05d}.parquet"))
+        return pos + 1
+
+
+def _read_checkpoint(path: str) -> Tuple[Optional[Dict], set, int]:
+    """(header, done resume keys, sink position after the last complete flush)"""
+    if not os.path.exists(path):
+        return None, set(), 0
+    header, done, pos = None, set(), 0
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # torn last line from a crash
+            if header is None:
+                header = rec
+                continue
+            done.update(rec["keys"])
+            pos = rec["pos"]
+    return header, done, pos
+
+
+# ---------------- score ----------------
+
+def cmd_score(args):
+    engine.echo = False
+    init_db()
+    out = args.out
+    ckpt_path = args.checkpoint or out + ".ckpt"
+    sink = ParquetSink(out) if out.endswith(".parquet") else CsvSink(out)
+
+    if args.fresh:
+        sink.truncate(0)
+        if os.path.exists(ckpt_path):
+            os.remove(ckpt_path)
+
+    jobs = _load_jobs(args.jobs, not args.no_extract, out + ".skills.json")
+    if not jobs:
+        raise SystemExit("no jobs with skills to score against")
+    job_keys = [j["key"] for j in jobs]
+
+    header, done, pos = _read_checkpoint(ckpt_path)
+    if header is not None and header.get("jobs") != job_keys:
+        raise SystemExit(f"{ckpt_path} was written for a different set of jobs; rerun with --fresh")
+    sink.truncate(pos)  # drop rows written after the last checkpoint
+    if header is None:
+        sink.truncate(0)
+        with open(ckpt_path, "w") as f:
+            f.write(json.dumps({"jobs": job_keys, "started": time.strftime("%Y-%m-%dT%H:%M:%S")}) + "\n")
+    if done:
+        print(f"↩️ resuming: {len(done)} resumes already scored", file=sys.stderr)
+
+    # Pool.imap drains its input on a helper thread without backpressure, so the
+    # generator itself waits for a free slot: at most 2 batches per worker are
+    # read but not yet consumed by the loop below
+    window = threading.Semaphore(2 * max(1, args.workers))
+    stop = threading.Event()
+
+    def pending() -> Iterator[List[str]]:
+        for keys in _resume_keys(args.resumes, args.batch):
+            keys = [k for k in keys if k not in done]
+            if not keys:
+                continue
+            while not window.acquire(timeout=0.5):
+                if stop.is_set():  # lets pool.terminate() join the feeding thread
+                    return
+            yield keys
+
+    t0 = time.perf_counter()
+    n_resumes = n_rows = 0
+    buf_rows: List[list] = []
+    buf_keys: List[str] = []
+
+    def flush():
+        nonlocal buf_rows, buf_keys
+        if not buf_keys:
+            return
+        p = sink.write(buf_rows) if buf_rows else sink.position()
+        with open(ckpt_path, "a") as f:
+            f.write(json.dumps({"keys": buf_keys, "pos": p}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        buf_rows, buf_keys = [], []
+
+    if args.workers <= 1:
+        _init_worker(jobs)
+        results = map(_score_batch, pending())
+        pool = None
+    else:
+        pool = Pool(args.workers, initializer=_init_worker, initargs=(jobs,))
+        results = pool.imap(_score_batch, pending())  # keeps input order
+    try:
+        for keys, rows in results:
+            window.release()
+            buf_keys.extend(keys)
+            buf_rows.extend(rows)
+            n_resumes += len(keys)
+            n_rows += len(rows)
+            if len(buf_keys) >= args.flush_every:
+                flush()
+                rate = n_resumes / (time.perf_counter() - t0)
+                print(f"📈 {n_resumes} resumes, {n_rows} rows ({rate:.0f} resumes/s)", file=sys.stderr)
+        flush()
+    finally:
+        stop.set()
+        if pool is not None:
+            pool.terminate()
+
+    took = time.perf_counter() - t0
+    print(f"✅ scored {n_resumes} resumes x {len(jobs)} jobs -> {n_rows} rows in {took:.1f}s "
+          f"({n_resumes / took if took else 0:.0f} resumes/s) -> {out}", file=sys.stderr)
+
+
+# ---------------- snapshots ----------------
+
+def _job_ids(spec: str) -> List[int]:
+    from app.db import crud
+    if spec == "all":
+        with Session(engine) as session:
+            return crud.all_job_ids(session)
+    try:
+        return [int(x) for x in spec.split(",") if x.strip()]
+    except ValueError:
+        raise SystemExit(f'--jobs takes "all" or comma-separated ids, not {spec!r}')
+
+
+def cmd_export(args):
+    from app.services import snapshot
+    engine.echo = False
+    init_db()
+    ids = _job_ids(args.jobs)
+    if not ids:
+        raise SystemExit("no jobs to export")
+    t0 = time.perf_counter()
+    tmp = args.out + ".tmp"
+    try:
+        with Session(engine) as session, open(tmp, "wb") as f:
+            rows = snapshot.export_jobs(session, ids, f, dtype="float16" if args.fp16 else "float32")
+        os.replace(tmp, args.out)
+    except snapshot.SnapshotError as e:
+        raise SystemExit(f"❌ {e}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    size = sum(r["bytes"] for r in rows)
+    print(f"📦 exported {len(rows)} jobs ({size / 1024:.0f} KiB) in {time.perf_counter() - t0:.1f}s -> {args.out}",
+          file=sys.stderr)
+
+
+def cmd_import(args):
+    from app.services import snapshot
+    engine.echo = False
+    init_db()
+    t0 = time.perf_counter()
+    n = 0
+    for path in args.bundles:
+        try:
+            with Session(engine) as session, open(path, "rb") as f:
+                for r in snapshot.import_bundle(session, f, overwrite=args.overwrite):
+                    n += 1
+                    if r["status"] == "skipped":
+                        print(f"⚠️ job {r['job_id']}: skipped, {r['reason']}", file=sys.stderr)
+                    else:
+                        print(f"📥 job {r['job_id']}: {r['status']}, {r['chunks']} chunks, {r['skills']} skills, "
+                              f"+{r['bank_added']} bank questions", file=sys.stderr)
+        except (OSError, snapshot.SnapshotError) as e:
+            raise SystemExit(f"❌ {path}: {e}")
+    print(f"✅ imported {n} jobs in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    sc = sub.add_parser("score", help="score every resume against every job")
+    sc.add_argument("--resumes", default="db", help='"db" or a directory of resume files')
+    sc.add_argument("--jobs", default="db", help='"db" or a directory of JD files')
+    sc.add_argument("--out", required=True, help="output .csv, or .parquet (directory of part files)")
+    sc.add_argument("--checkpoint", help="checkpoint file (default: <out>.ckpt)")
+    sc.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    sc.add_argument("--batch", type=int, default=64, help="resumes per worker task")
+    sc.add_argument("--flush-every", type=int, default=1000, help="resumes per output flush/checkpoint")
+    sc.add_argument("--no-extract", action="store_true", help="skip jobs without cached skills instead of calling the LLM")
+    sc.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint and start over")
+    sc.set_defaults(func=cmd_score)
+
+    ex = sub.add_parser("export", help="write jobs to a snapshot bundle")
+    ex.add_argument("--jobs", default="all", help='"all" or comma-separated job ids')
+    ex.add_argument("--out", required=True, help="bundle file to write")
+    ex.add_argument("--fp16", action="store_true", help="store vectors as float16 (half the size)")
+    ex.set_defaults(func=cmd_export)
+
+    im = sub.add_parser("import", help="load snapshot bundles into this node's DB and vector store")
+    im.add_argument("bundles", nargs="+", help="bundle files written by export")
+    im.add_argument("--overwrite", action="store_true", help="replace jobs that exist with a different JD")
+    im.set_defaults(func=cmd_import)
+
+    args = ap.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,69 @@
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     db_url: str = "sqlite:///./app.db"   # SQLite file in project root
+    db_echo: bool = True                 # log SQL statements (turn off for load tests)
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"  # "fake:384" = hash embeddings, for load tests
+    vector_backend: str = "chroma"       # "chroma" or "numpy" (in-process exact search)
+    vector_root: str = "vector_db"       # shard directory for the numpy backend
+
+    # Ollama endpoints (JSON in env), each {"url", "model", "pool"?, "max_concurrency"?}
+    llm_backends: List[Dict] = [{"url": "http://localhost:11434", "model": "mistral:latest"}]
+    llm_chain_pools: Dict[str, str] = {}  # chain -> pool, e.g. {"skills": "light", "grade": "heavy"}
+    llm_health_interval: float = 15.0     # seconds between /api/tags probes (0 = off)
+    llm_retries: int = 2                  # failover attempts on connection errors
+    llm_acquire_timeout: float = 30.0     # max wait for a free backend slot
+    llm_structured_output: bool = True    # send each chain's JSON schema as Ollama `format`
+    llm_json_retries: int = 1             # re-generate when the reply has no usable JSON
+
+    # Deadlines and circuit breakers (app/services/resilience.py)
+    llm_deadlines: Dict[str, float] = {"skills": 30.0, "quiz": 20.0, "grade": 15.0}  # seconds per chain call, after admission
+    llm_deadline_items: int = 5           # a list chain's deadline covers this many items (a default quiz); more get proportionally longer
+    llm_read_timeout: float = 15.0        # abort a call when Ollama sends nothing for this long (<= smallest deadline)
+    breaker_failure_threshold: int = 5    # consecutive timeouts/errors that open a pool's breaker
+    breaker_reset_s: float = 30.0         # open -> one trial call after this long
+
+    # Admission control in front of the chains (app/services/scheduler.py)
+    scheduler_enabled: bool = True
+    scheduler_capacity: int = 0           # concurrent LLM calls; 0 = sum of backend max_concurrency
+    scheduler_concurrency: Dict[str, float] = {"interactive": 1.0, "grade": 0.75, "background": 0.25}  # share of capacity
+    scheduler_queue_depth: Dict[str, int] = {"interactive": 32, "grade": 64, "background": 256}
+    scheduler_max_wait: Dict[str, float] = {"interactive": 10.0, "grade": 30.0, "background": 0.0}  # seconds, 0 = no limit
+
+    # Per-job question bank served by /quiz/start
+    question_bank_size: int = 20          # questions generated per job (~4x the default quiz size)
+    question_bank_max_serves: int = 50    # a question is retired after this many quizzes
+    question_bank_low_water: int = 10     # replenish when fewer servable questions remain
+
+    # Deterministic pre-grader in front of the grading LLM (see quiz.PreGradeThresholds)
+    pregrade_enabled: bool = True
+    pregrade_min_chars: int = 2
+    pregrade_negation_max_words: int = 8
+    pregrade_confident_years: float = 3.0
+    pregrade_confident_min_words: int = 12
+
+    # Retrieved-context compression (app/services/context.py); budgets are approximate tokens
+    context_compression: bool = True
+    context_budget_skills: int = 700
+    context_budget_quiz: int = 700
+    context_budget_grade: int = 350
+    context_cache_size: int = 1024
+    context_cache_ttl_s: float = 60.0     # other workers see an updated JD's context after at most this long
+
+    # Per-job leaderboard fed by /match (app/services/leaderboard.py)
+    leaderboard_enabled: bool = True
+    leaderboard_resync_s: float = 300.0   # rebuild a job's in-memory histogram from the table after this long
+
+    # /admin routes require `Authorization: Bearer <admin_token>`; empty = admin API disabled
+    admin_token: str = ""
+
+    # Opt-in request profiling (app/core/profiling.py); listed at GET /admin/profiles
+    profile_sample_rate: float = 0.0      # fraction of requests profiled (0 = only on header)
+    profile_header: str = "X-Profile"     # send this header to profile one request
+    profile_token: str = ""               # if set, the header value must equal it
+    profile_dir: str = "profiles"         # where .prof files are written
+    profile_keep: int = 200               # newest profiles kept on disk
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,58 @@
+# app/core/metrics.py
+"""
+Process-local counters and timers, exposed at GET /metrics.
+
+    metrics.incr("pregrade.total")
+    metrics.observe("llm.queue_wait_s", 0.12)
+    metrics.register_ratio("pregrade.short_circuit_rate", "pregrade.short_circuited", "pregrade.total")
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Tuple
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timers: Dict[str, list] = {}  # name -> [count, total, max]
+        self._ratios: Dict[str, Tuple[str, str]] = {}
+
+    def incr(self, name: str, value: float = 1.0):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            t = self._timers.setdefault(name, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += value
+            t[2] = max(t[2], value)
+
+    def register_ratio(self, name: str, numerator: str, denominator: str):
+        self._ratios[name] = (numerator, denominator)
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {
+                k: {"count": c, "total": round(tot, 6), "avg": round(tot / c, 6) if c else 0.0, "max": round(mx, 6)}
+                for k, (c, tot, mx) in self._timers.items()
+            }
+        ratios = {
+            k: round(counters.get(num, 0.0) / counters[den], 4) if counters.get(den) else None
+            for k, (num, den) in self._ratios.items()
+        }
+        return {"counters": counters, "timers": timers, "ratios": ratios}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+
+metrics = Metrics()
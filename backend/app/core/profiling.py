@@ -0,0 +1,221 @@
+# app/core/profiling.py
+"""
+Opt-in cProfile capture for single requests.
+
+A request is profiled when it carries the `X-Profile` header (value must match
+PROFILE_TOKEN if one is set) or is picked by PROFILE_SAMPLE_RATE. The profile
+covers the endpoint body, i.e. the route plus everything it calls in
+aligner/quiz/crud, and is written to PROFILE_DIR as a pstats file listed at
+GET /admin/profiles. The response carries `X-Profile-Id`.
+
+Sync endpoints run in FastAPI's threadpool, so a middleware-level profiler on
+the event loop would miss them. Instead ProfilingMiddleware only decides and
+publishes a RequestProfile through a contextvar, and ProfiledRoute wraps each
+endpoint to enable cProfile in whichever thread actually runs it. When nothing
+is being profiled the cost is one header lookup and one contextvar read.
+
+Only one endpoint is profiled at a time per process (on Python >= 3.12 the
+profiler is process-wide and also records other threads' work). A request
+selected while another is being profiled runs unprofiled and gets no
+X-Profile-Id; GET /metrics counts these as profile.skipped.
+
+    router = APIRouter(prefix="/quiz", route_class=ProfiledRoute)
+"""
+import asyncio
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+_write_lock = threading.Lock()
+_profiler_lock = threading.Lock()  # held while any endpoint is being profiled
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started = time.time()
+        self.profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _start(self) -> Optional[cProfile.Profile]:
+        # one profiler at a time per process: on Python >= 3.12 cProfile sits on the
+        # process-wide sys.monitoring, and a second enable() raises ValueError
+        if not _profiler_lock.acquire(blocking=False):
+            return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:  # another tool (debugger, coverage) holds the profiler slot
+            _profiler_lock.release()
+            return None
+        with self._lock:
+            self.profilers.append(prof)
+        return prof
+
+    @staticmethod
+    def _stop(prof: cProfile.Profile):
+        prof.disable()
+        _profiler_lock.release()
+
+    def run(self, fn: Callable, *args, **kwargs):
+        prof = self._start()
+        if prof is None:
+            metrics.incr("profile.skipped")
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._stop(prof)
+
+    async def run_async(self, fn: Callable, *args, **kwargs):
+        # runs on the event loop thread: other requests interleaving at awaits show up too
+        prof = self._start()
+        if prof is None:
+            metrics.incr("profile.skipped")
+            return await fn(*args, **kwargs)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            self._stop(prof)
+
+    def save(self, status: int) -> Optional[str]:
+        if not self.profilers:
+            return None  # no profiled endpoint ran (404, middleware-only route, ...)
+        os.makedirs(settings.profile_dir, exist_ok=True)
+        stats = pstats.Stats(self.profilers[0])
+        for p in self.profilers[1:]:
+            stats.add(p)
+        base = os.path.join(settings.profile_dir, self.id)
+        stats.dump_stats(base + ".prof")
+        meta = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "trigger": self.trigger,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "duration_ms": round(1000 * (time.time() - self.started), 1),
+            "calls": stats.total_calls,
+        }
+        with open(base + ".json", "w") as f:
+            json.dump(meta, f)
+        _prune()
+        return base + ".prof"
+
+
+def _prune():
+    with _write_lock:
+        metas = sorted(f for f in os.listdir(settings.profile_dir) if f.endswith(".json"))
+        for name in metas[: max(0, len(metas) - settings.profile_keep)]:
+            for ext in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(settings.profile_dir, name[:-5] + ext))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles(limit: int = 50) -> List[dict]:
+    if not os.path.isdir(settings.profile_dir):
+        return []
+    out = []
+    for name in sorted((f for f in os.listdir(settings.profile_dir) if f.endswith(".json")), reverse=True)[:limit]:
+        try:
+            with open(os.path.join(settings.profile_dir, name)) as f:
+                out.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    # ids are generated here; reject anything that could walk out of the directory
+    if not profile_id or os.path.basename(profile_id) != profile_id:
+        return None
+    path = os.path.join(settings.profile_dir, profile_id + ".prof")
+    return path if os.path.isfile(path) else None
+
+
+def _wrap(endpoint: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            prof = _current.get()
+            if prof is None:
+                return await endpoint(*args, **kwargs)
+            return await prof.run_async(endpoint, *args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            # the threadpool copies the request's context, so the contextvar is visible here
+            prof = _current.get()
+            if prof is None:
+                return endpoint(*args, **kwargs)
+            return prof.run(endpoint, *args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint is profiled when the middleware selected the request."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _wrap(endpoint), **kwargs)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI so unprofiled requests don't pay for BaseHTTPMiddleware."""
+
+    def __init__(self, app):
+        self.app = app
+        self.header = settings.profile_header.lower().encode("latin-1")
+
+    def _trigger(self, scope) -> Optional[str]:
+        for k, v in scope.get("headers") or ():
+            if k == self.header:
+                if settings.profile_token and v.decode("latin-1") != settings.profile_token:
+                    return None
+                return "header"
+        if settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/profiles"):
+            return await self.app(scope, receive, send)
+        trigger = self._trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        prof = RequestProfile(scope["method"], scope["path"], trigger)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if prof.profilers:  # empty if the endpoint ran unprofiled
+                    message["headers"] = list(message["headers"]) + [(b"x-profile-id", prof.id.encode())]
+            await send(message)
+
+        token = _current.set(prof)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            # pstats dump is file I/O; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, prof.save, status["code"])
@@ -0,0 +1,135 @@
+# app/db/compress_backfill.py
+"""
+Compress existing text rows in place and report the savings.
+
+    cd backend
+    python -m app.db.compress_backfill --dry-run          # report only
+    python -m app.db.compress_backfill --train --vacuum   # train a corpus dictionary, rewrite, shrink file
+
+Rows already stored with the active dictionary are left alone, so the
+command is safe to re-run (e.g. after --train to re-pack with a new dictionary).
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app.db.compression import ZLIB, BUILTIN_DICT_ID, compress_text, decompress_text, register_dict, train_dict
+from app.db.session import engine, init_db
+
+COLUMNS = [("job", "jd_text"), ("resume", "text"), ("question", "text"), ("answer", "text")]
+
+
+def _stored_len(v) -> int:
+    if v is None:
+        return 0
+    return len(v.encode("utf-8")) if isinstance(v, str) else len(bytes(v))
+
+
+def _db_pages(conn):
+    if engine.dialect.name != "sqlite":
+        return None
+    pages = conn.execute(text("PRAGMA page_count")).scalar()
+    size = conn.execute(text("PRAGMA page_size")).scalar()
+    return pages, pages * size
+
+
+def _train(sample: int) -> int:
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT jd_text FROM job ORDER BY id DESC LIMIT :n"
+        ), {"n": sample}).all() + conn.execute(text(
+            "SELECT text FROM resume ORDER BY id DESC LIMIT :n"
+        ), {"n": sample}).all()
+    data = train_dict(decompress_text(r[0]) or "" for r in rows)
+    with engine.begin() as conn:
+        last = conn.execute(text("SELECT MAX(id) FROM textdict")).scalar() or BUILTIN_DICT_ID
+        dict_id = last + 1
+        if dict_id > 255:
+            raise SystemExit("too many trained dictionaries (max 254)")
+        conn.execute(text("INSERT INTO textdict (id, data, created_at) VALUES (:id, :d, :t)"),
+                     {"id": dict_id, "d": data, "t": time.strftime("%Y-%m-%d %H:%M:%S")})
+    register_dict(dict_id, data, active=True)
+    print(f"trained dictionary {dict_id}: {len(data)} bytes from {len(rows)} documents")
+    return dict_id
+
+
+def backfill(batch: int, dry_run: bool, dict_id: int | None) -> list[dict]:
+    report = []
+    for table, col in COLUMNS:
+        stats = {"column": f"{table}.{col}", "rows": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+        last = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    text(f'SELECT id, "{col}" FROM "{table}" WHERE id > :last ORDER BY id LIMIT :n'),
+                    {"last": last, "n": batch},
+                ).all()
+                if not rows:
+                    break
+                for row_id, stored in rows:
+                    last = row_id
+                    stats["rows"] += 1
+                    before = _stored_len(stored)
+                    stats["bytes_before"] += before
+                    raw = bytes(stored) if stored is not None and not isinstance(stored, str) else None
+                    up_to_date = raw is not None and raw[:1] == ZLIB and (dict_id is None or raw[1] == dict_id)
+                    packed = None if stored is None or up_to_date else compress_text(decompress_text(stored), dict_id=dict_id)
+                    if packed is None or packed == raw:
+                        # short/incompressible rows stay raw (e.g. migrated from a Postgres TEXT column)
+                        stats["bytes_after"] += before
+                        continue
+                    stats["bytes_after"] += len(packed)
+                    stats["rewritten"] += 1
+                    if not dry_run:
+                        conn.execute(text(f'UPDATE "{table}" SET "{col}" = :v WHERE id = :id'), {"v": packed, "id": row_id})
+        report.append(stats)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--dry-run", action="store_true", help="compute savings without writing")
+    ap.add_argument("--train", action="store_true", help="train a dictionary from the corpus first")
+    ap.add_argument("--sample", type=int, default=2000, help="documents per table used for training")
+    ap.add_argument("--vacuum", action="store_true", help="VACUUM afterwards so the file actually shrinks (SQLite)")
+    args = ap.parse_args()
+
+    engine.echo = False
+    init_db()
+    with engine.connect() as conn:
+        pages_before = _db_pages(conn)
+
+    dict_id = _train(args.sample) if args.train and not args.dry_run else None
+    t0 = time.perf_counter()
+    report = backfill(args.batch, args.dry_run, dict_id)
+    took = time.perf_counter() - t0
+
+    if args.vacuum and not args.dry_run and engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+    print(f"{'column':<16}{'rows':>9}{'rewritten':>11}{'before':>14}{'after':>14}{'saved':>8}")
+    tb = ta = 0
+    for r in report:
+        tb += r["bytes_before"]
+        ta += r["bytes_after"]
+        saved = 100.0 * (1 - r["bytes_after"] / r["bytes_before"]) if r["bytes_before"] else 0.0
+        print(f"{r['column']:<16}{r['rows']:>9}{r['rewritten']:>11}{r['bytes_before']:>14}{r['bytes_after']:>14}{saved:>7.1f}%")
+    if tb:
+        print(f"text payload: {tb} -> {ta} bytes ({100.0 * (1 - ta / tb):.1f}% smaller) in {took:.1f}s"
+              + (" [dry run]" if args.dry_run else ""))
+
+    with engine.connect() as conn:
+        pages_after = _db_pages(conn)
+    if pages_before and pages_after:
+        print(f"sqlite pages: {pages_before[0]} -> {pages_after[0]} "
+              f"({pages_before[1]} -> {pages_after[1]} bytes; full-scan I/O "
+              f"{100.0 * (1 - pages_after[0] / pages_before[0]):.1f}% lower)")
+        if not args.vacuum and not args.dry_run:
+            print("run with --vacuum to return freed pages to the filesystem")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# app/db/compression.py
+"""
+Transparent compression for large text columns (JD, resume, question, answer text).
+
+Stored format (BLOB):
+  b"\x00" + utf-8                      short or incompressible text
+  b"\x1f" + dict_id + zlib stream      zlib with preset dictionary `dict_id`
+Legacy rows written as plain TEXT are returned unchanged, so old databases
+keep working and can be converted with `python -m app.db.compress_backfill`.
+
+dict_id 1 is the built-in dictionary below; ids >= 2 are trained from the
+corpus by the backfill command and stored in the `textdict` table.
+"""
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+RAW = b"\x00"
+ZLIB = b"\x1f"
+MIN_COMPRESS_BYTES = 64
+BUILTIN_DICT_ID = 1
+
+# Frequent JD/resume vocabulary; zlib favours matches near the end of the dictionary
+_BUILTIN_WORDS = """
+equal opportunity employer benefits health insurance dental vision paid time off 401(k) parental leave
+remote hybrid on-site full-time part-time contract salary compensation stock options bonus
+about us our mission our team we are looking for you will join a fast-growing company
+bachelor's degree master's degree computer science engineering or related field or equivalent experience
+nice to have preferred qualifications minimum qualifications basic qualifications
+communication skills problem-solving skills attention to detail team player self-motivated
+cross-functional collaborate with stakeholders product managers designers engineers
+design develop implement maintain deploy monitor optimize scalable reliable secure
+microservices REST APIs GraphQL gRPC event-driven distributed systems data pipelines
+Python Java JavaScript TypeScript Go Rust C++ C# Kotlin Swift Ruby PHP Scala SQL Bash
+React Angular Vue.js Node.js Next.js Django Flask FastAPI Spring Boot .NET Express
+PostgreSQL MySQL MongoDB Redis Elasticsearch Kafka RabbitMQ Spark Airflow Snowflake BigQuery
+AWS Azure GCP EC2 S3 Lambda RDS EKS Docker Kubernetes Terraform Ansible Helm Jenkins GitHub Actions CI/CD
+Git Linux Agile Scrum Jira unit testing integration testing TDD code review mentoring
+machine learning deep learning PyTorch TensorFlow scikit-learn pandas NumPy NLP LLM
+Experience Education Skills Projects Certifications Summary Professional Experience Work Experience
+Responsibilities Requirements Qualifications What you will do What we offer
+years of experience in with strong knowledge of hands-on experience proficiency in familiarity with
+responsible for led developed designed implemented built managed improved reduced increased delivered
+January February March April May June July August September October November December Present
+University Institute College GPA Bachelor of Science Master of Science Ph.D.
+Email Phone LinkedIn GitHub Portfolio Address References available upon request
+ the and of to in for with on at by from as is are be this that will you your our we an a
+"""
+_BUILTIN_DICT = " ".join(_BUILTIN_WORDS.split()).encode("utf-8")
+
+_dicts: Dict[int, bytes] = {BUILTIN_DICT_ID: _BUILTIN_DICT}
+_active_id = BUILTIN_DICT_ID
+_lock = threading.Lock()
+
+
+def register_dict(dict_id: int, data: bytes, active: bool = False):
+    global _active_id
+    with _lock:
+        _dicts[dict_id] = data
+        if active:
+            _active_id = dict_id
+
+
+def load_dicts(conn):
+    """Register every trained dictionary; the newest becomes active for new writes."""
+    from sqlalchemy import text
+    rows = conn.execute(text("SELECT id, data FROM textdict ORDER BY id")).all()
+    for dict_id, data in rows:
+        register_dict(dict_id, bytes(data), active=True)
+
+
+def _get_dict(dict_id: int) -> bytes:
+    if dict_id in _dicts:
+        return _dicts[dict_id]
+    # written by another process (e.g. the backfill command): load it once
+    from app.db.session import engine
+    from sqlalchemy import text
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT data FROM textdict WHERE id = :id"), {"id": dict_id}).first()
+    if row is None:
+        raise ValueError(f"unknown compression dictionary {dict_id}")
+    register_dict(dict_id, bytes(row[0]))
+    return _dicts[dict_id]
+
+
+def compress_text(value: str, dict_id: Optional[int] = None) -> bytes:
+    raw = value.encode("utf-8")
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return RAW + raw
+    dict_id = dict_id or _active_id
+    c = zlib.compressobj(level=9, zdict=_get_dict(dict_id))
+    out = ZLIB + bytes([dict_id]) + c.compress(raw) + c.flush()
+    return out if len(out) < len(raw) + 1 else RAW + raw
+
+
+def decompress_text(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value  # legacy uncompressed TEXT
+    value = bytes(value)
+    if value[:1] == ZLIB:
+        d = zlib.decompressobj(zdict=_get_dict(value[1]))
+        return (d.decompress(value[2:]) + d.flush()).decode("utf-8")
+    if value[:1] == RAW:
+        return value[1:].decode("utf-8")
+    return value.decode("utf-8", errors="replace")
+
+
+def train_dict(samples: Iterable[str], max_bytes: int = 32 * 1024) -> bytes:
+    """
+    Build a zlib preset dictionary from sample texts: frequent lines and
+    word 3-grams, least frequent first so the most common end up closest.
+    """
+    counts: Counter = Counter()
+    for text in samples:
+        for line in text.splitlines():
+            line = " ".join(line.split())
+            if 8 <= len(line) <= 120:
+                counts[line] += 3
+        words = text.split()
+        for i in range(len(words) - 2):
+            counts[" ".join(words[i:i + 3])] += 1
+    picked, size = [], 0
+    for s, n in counts.most_common():
+        if n < 2:
+            break
+        b = s.encode("utf-8") + b"\n"
+        if size + len(b) > max_bytes:
+            break
+        picked.append(b)
+        size += len(b)
+    return b"".join(reversed(picked)) or _BUILTIN_DICT
+
+
+class CompressedText(TypeDecorator):
+    """str on the Python side, compressed BLOB in the database."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
+
+    def result_processor(self, dialect, coltype):
+        # skip LargeBinary's bytes() coercion: legacy rows come back as str
+        def process(value):
+            return self.process_result_value(value, dialect)
+        return process
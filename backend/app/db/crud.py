@@ -1,5 +1,11 @@
+import hashlib
+import json
+from datetime import datetime
+from sqlalchemy import and_, func, or_, text as sql_text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer
 from sqlmodel import Session, select
-from app.db.models import Job, Resume, Quiz, Question, Answer
+from app.db.models import Job, Resume, Quiz, Question, Answer, BankQuestion, MatchResult, LeaderboardEntry
 
 # --- Job ---
 def create_job(session: Session, title: str, jd_text: str) -> Job:
@@ -9,8 +15,61 @@ def create_job(session: Session, title: str, jd_text: str) -> Job:
     session.refresh(job)
     return job
 
-def get_job(session: Session, job_id: int) -> Job | None:
-    return session.get(Job, job_id)
+def restore_job(session: Session, job_id: int, title: str, jd_text: str, created_at: datetime | None = None) -> Job:
+    # explicit id: a job imported from a snapshot keeps the id it has on other replicas
+    job = Job(id=job_id, title=title, jd_text=jd_text, created_at=created_at or datetime.utcnow())
+    session.add(job)
+    session.flush()
+    if session.get_bind().dialect.name == "postgresql":
+        # explicit ids don't advance the serial; without this the next create_job collides
+        session.execute(sql_text(
+            "SELECT setval(pg_get_serial_sequence('job', 'id'), (SELECT MAX(id) FROM job))"
+        ))
+    session.commit()
+    session.refresh(job)
+    return job
+
+def all_job_ids(session: Session) -> list[int]:
+    return list(session.exec(select(Job.id).order_by(Job.id)).all())
+
+def get_job(session: Session, job_id: int, lazy_text: bool = False) -> Job | None:
+    # lazy_text: leave jd_text unloaded (and compressed) until it is first accessed
+    return session.get(Job, job_id, options=[defer(Job.jd_text)] if lazy_text else None)
+
+def update_job(session: Session, job_id: int, title: str, jd_text: str) -> Job | None:
+    job = session.get(Job, job_id)
+    if not job:
+        return None
+    if job.jd_text != jd_text:
+        job.jd_version = (job.jd_version or 0) + 1
+    job.title = title
+    job.jd_text = jd_text
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+def get_jd_version(session: Session, job_id: int) -> int | None:
+    # a column read, not session.get(): the identity map may hold an older row
+    return session.exec(select(Job.jd_version).where(Job.id == job_id)).first()
+
+def get_job_skills(session: Session, job_id: int) -> list[dict] | None:
+    job = session.get(Job, job_id)
+    if not job or job.skills_json is None:
+        return None
+    return json.loads(job.skills_json)
+
+def set_job_skills(session: Session, job_id: int, skills: list[dict] | None) -> Job | None:
+    """Store (or clear, with None) the cached skills and bump skills_version."""
+    job = session.get(Job, job_id)
+    if not job:
+        return None
+    job.skills_json = json.dumps(skills) if skills is not None else None
+    job.skills_version = (job.skills_version or 0) + 1
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
 
 # --- Resume ---
 def create_resume(session: Session, text: str) -> Resume:
@@ -20,8 +79,20 @@ def create_resume(session: Session, text: str) -> Resume:
     session.refresh(resume)
     return resume
 
-def get_resume(session: Session, resume_id: int) -> Resume | None:
-    return session.get(Resume, resume_id)
+def get_resume(session: Session, resume_id: int, lazy_text: bool = False) -> Resume | None:
+    return session.get(Resume, resume_id, options=[defer(Resume.text)] if lazy_text else None)
+
+def update_resume_text(session: Session, resume_id: int, text: str) -> Resume | None:
+    resume = session.get(Resume, resume_id)
+    if not resume:
+        return None
+    if resume.text != text:
+        resume.text = text
+        resume.version = (resume.version or 1) + 1
+        session.add(resume)
+        session.commit()
+        session.refresh(resume)
+    return resume
 
 # --- Quiz ---
 def create_quiz(session: Session, job_id: int) -> Quiz:
@@ -34,6 +105,13 @@ def create_quiz(session: Session, job_id: int) -> Quiz:
 def get_quiz(session: Session, quiz_id: int) -> Quiz | None:
     return session.get(Quiz, quiz_id)
 
+def bump_grades_version(session: Session, quiz_id: int) -> None:
+    quiz = session.get(Quiz, quiz_id)
+    if quiz:
+        quiz.grades_version = (quiz.grades_version or 0) + 1
+        session.add(quiz)
+        session.commit()
+
 def add_questions(session: Session, quiz_id: int, questions: list[str]) -> list[Question]:
     rows: list[Question] = []
     for i, text in enumerate(questions):
@@ -60,12 +138,53 @@ def add_answers(session: Session, quiz_id: int, answers: dict[int, str]) -> list
         session.refresh(r)
     return rows
 
+def answer_hash(text: str) -> str:
+    norm = " ".join((text or "").split()).casefold()
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+def save_answer_versions(
+    session: Session, quiz_id: int, answers: dict[int, str]
+) -> tuple[dict[int, Answer], set[int]]:
+    """
+    Store a submission as answer versions. An answer whose normalized text matches
+    the current version reuses that row; otherwise a new version row is inserted.
+    Returns ({question_id: current row}, {question_ids whose answer changed}).
+    """
+    current: dict[int, Answer] = {}
+    changed: set[int] = set()
+    for qid, text in answers.items():
+        h = answer_hash(text)
+        latest = get_answer_for_question(session, quiz_id, qid)
+        if latest and (latest.answer_hash or answer_hash(latest.text)) == h:
+            current[qid] = latest
+            continue
+        row = Answer(
+            quiz_id=quiz_id, question_id=qid, text=text, answer_hash=h,
+            version=(latest.version or 1) + 1 if latest else 1,
+        )
+        session.add(row)
+        current[qid] = row
+        changed.add(qid)
+    session.commit()
+    for qid in changed:
+        session.refresh(current[qid])
+    return current, changed
+
 def get_answer_for_question(session: Session, quiz_id: int, question_id: int) -> Answer | None:
     stmt = select(Answer).where(
         Answer.quiz_id == quiz_id, Answer.question_id == question_id
     ).order_by(Answer.id.desc())
     return session.exec(stmt).first()
 
+def latest_answers(session: Session, quiz_id: int) -> dict[int, Answer]:
+    """Current answer version per question: {question_id: row}."""
+    latest = (
+        select(func.max(Answer.id))
+        .where(Answer.quiz_id == quiz_id)
+        .group_by(Answer.question_id)
+    )
+    return {a.question_id: a for a in session.exec(select(Answer).where(Answer.id.in_(latest))).all()}
+
 def update_answer_grade(
     session: Session, answer_id: int, acc: int, comp: int, comm: int, pct: int, tip: str
 ) -> Answer | None:
@@ -83,9 +202,261 @@ def update_answer_grade(
     return row
 
 def quiz_overall(session: Session, quiz_id: int) -> int:
-    stmt = select(Answer).where(Answer.quiz_id == quiz_id)
-    rows = session.exec(stmt).all()
-    if not rows:
-        return 0
-    vals = [a.score_pct or 0 for a in rows]
-    return round(sum(vals) / len(vals))
+    # average over the latest answer version per question only
+    latest = (
+        select(func.max(Answer.id))
+        .where(Answer.quiz_id == quiz_id)
+        .group_by(Answer.question_id)
+    )
+    stmt = select(func.avg(func.coalesce(Answer.score_pct, 0))).where(Answer.id.in_(latest))
+    avg = session.exec(stmt).one()
+    return round(avg) if avg is not None else 0
+
+# --- Question bank ---
+def list_bank(session: Session, job_id: int) -> list[BankQuestion]:
+    stmt = select(BankQuestion).where(BankQuestion.job_id == job_id).order_by(BankQuestion.id)
+    return session.exec(stmt).all()
+
+def add_bank_questions(
+    session: Session, job_id: int, texts: list[str], max_serves: int | None = None
+) -> list[BankQuestion]:
+    """
+    Add questions not already in the bank. With max_serves, a question that
+    matches a retired row (served max_serves times) brings that row back into
+    rotation instead of being dropped as a duplicate.
+    """
+    have = {" ".join(b.text.split()).casefold(): b for b in list_bank(session, job_id)}
+    rows: list[BankQuestion] = []
+    for text in texts:
+        key = " ".join(text.split()).casefold()
+        if not key:
+            continue
+        old = have.get(key)
+        if old is not None:
+            if max_serves is None or old.times_served < max_serves:
+                continue
+            old.times_served = 0
+            row = old
+        else:
+            row = have[key] = BankQuestion(job_id=job_id, text=text)
+        session.add(row)
+        rows.append(row)
+    session.commit()
+    for r in rows:
+        session.refresh(r)
+    return rows
+
+def clear_bank(session: Session, job_id: int) -> int:
+    rows = list_bank(session, job_id)
+    for r in rows:
+        session.delete(r)
+    session.commit()
+    return len(rows)
+
+def mark_bank_served(session: Session, rows: list[BankQuestion]) -> None:
+    # incremented in SQL, so concurrent /quiz/start calls don't overwrite each other's counts
+    ids = [r.id for r in rows]
+    if not ids:
+        return
+    session.exec(
+        update(BankQuestion).where(BankQuestion.id.in_(ids)).values(times_served=BankQuestion.times_served + 1)
+    )
+    session.commit()
+
+# --- Materialized /match results ---
+MatchKey = tuple[int, int, int, int, int, int]  # job, resume, quiz, skills_v, resume_v, grades_v
+
+def match_key(job: Job, resume: Resume | None, quiz: Quiz | None) -> MatchKey:
+    return (
+        job.id,
+        resume.id if resume else 0,
+        quiz.id if quiz else 0,
+        job.skills_version or 0,
+        (resume.version or 1) if resume else 0,
+        (quiz.grades_version or 0) if quiz else 0,
+    )
+
+def match_etag(key: MatchKey) -> str:
+    return '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:20] + '"'
+
+def get_match_result(session: Session, key: MatchKey) -> MatchResult | None:
+    job_id, resume_id, quiz_id, sv, rv, gv = key
+    stmt = select(MatchResult).where(
+        MatchResult.job_id == job_id,
+        MatchResult.resume_id == resume_id,
+        MatchResult.quiz_id == quiz_id,
+        MatchResult.skills_version == sv,
+        MatchResult.resume_version == rv,
+        MatchResult.grades_version == gv,
+    )
+    return session.exec(stmt).first()
+
+def save_match_result(session: Session, key: MatchKey, payload: dict) -> MatchResult:
+    """Store the payload for `key`, dropping results for older versions of the same triple."""
+    job_id, resume_id, quiz_id, sv, rv, gv = key
+    stale = select(MatchResult).where(
+        MatchResult.job_id == job_id, MatchResult.resume_id == resume_id, MatchResult.quiz_id == quiz_id
+    )
+    for row in session.exec(stale).all():
+        session.delete(row)
+    row = MatchResult(
+        job_id=job_id, resume_id=resume_id, quiz_id=quiz_id,
+        skills_version=sv, resume_version=rv, grades_version=gv,
+        etag=match_etag(key), payload=json.dumps(payload),
+    )
+    session.add(row)
+    try:
+        session.commit()
+    except IntegrityError:
+        # a concurrent request stored the same key first
+        session.rollback()
+        return get_match_result(session, key)
+    session.refresh(row)
+    return row
+
+# --- Leaderboard ---
+LEADERBOARD_COLUMNS = {"combined": "combined", "cv": "cv_score", "quiz": "quiz_score"}
+
+def get_leaderboard_entry(session: Session, job_id: int, resume_id: int, quiz_id: int) -> LeaderboardEntry | None:
+    """The candidate's entry: by resume, or by quiz when there is no resume."""
+    stmt = select(LeaderboardEntry).where(LeaderboardEntry.job_id == job_id)
+    if resume_id:
+        stmt = stmt.where(LeaderboardEntry.resume_id == resume_id)
+    else:
+        stmt = stmt.where(LeaderboardEntry.resume_id == 0, LeaderboardEntry.quiz_id == quiz_id)
+    return session.exec(stmt).first()
+
+def leaderboard_entry_with_quiz(session: Session, job_id: int, quiz_id: int) -> LeaderboardEntry | None:
+    """The resume entry whose latest result includes this quiz, if any."""
+    stmt = select(LeaderboardEntry).where(
+        LeaderboardEntry.job_id == job_id, LeaderboardEntry.quiz_id == quiz_id, LeaderboardEntry.resume_id > 0
+    )
+    return session.exec(stmt).first()
+
+def upsert_leaderboard_entry(
+    session: Session, job_id: int, resume_id: int, quiz_id: int, scores: dict, badge: str | None
+) -> tuple[list[dict], LeaderboardEntry]:
+    """
+    Store the latest scores for a candidate; returns (scores of the rows this
+    replaced, row). A resume+quiz result absorbs the quiz's quiz-only entry in
+    the same transaction, so the candidate is counted once.
+    """
+    def scores_of(r: LeaderboardEntry) -> dict:
+        return {m: getattr(r, c) for m, c in LEADERBOARD_COLUMNS.items()}
+
+    replaced = []
+    row = get_leaderboard_entry(session, job_id, resume_id, quiz_id)
+    if row is None:
+        row = LeaderboardEntry(job_id=job_id, resume_id=resume_id, quiz_id=quiz_id)
+    else:
+        replaced.append(scores_of(row))
+        row.quiz_id = quiz_id
+    if resume_id and quiz_id:
+        quiz_only = get_leaderboard_entry(session, job_id, 0, quiz_id)
+        if quiz_only is not None:
+            replaced.append(scores_of(quiz_only))
+            session.delete(quiz_only)
+    for m, c in LEADERBOARD_COLUMNS.items():
+        setattr(row, c, scores.get(m))
+    row.badge = badge
+    row.updated_at = datetime.utcnow()
+    session.add(row)
+    try:
+        session.commit()
+    except IntegrityError:
+        # a concurrent request inserted the same candidate first
+        session.rollback()
+        return upsert_leaderboard_entry(session, job_id, resume_id, quiz_id, scores, badge)
+    session.refresh(row)
+    return replaced, row
+
+def clear_leaderboard(session: Session, job_id: int) -> int:
+    rows = session.exec(select(LeaderboardEntry).where(LeaderboardEntry.job_id == job_id)).all()
+    for r in rows:
+        session.delete(r)
+    session.commit()
+    return len(rows)
+
+def leaderboard_scores(session: Session, job_id: int, metric: str) -> list[float]:
+    col = getattr(LeaderboardEntry, LEADERBOARD_COLUMNS[metric])
+    stmt = select(col).where(LeaderboardEntry.job_id == job_id, col.is_not(None))
+    return list(session.exec(stmt).all())
+
+def leaderboard_top(session: Session, job_id: int, metric: str, k: int) -> list[LeaderboardEntry]:
+    # served from the (job_id, <score>) index: O(log n + k)
+    col = getattr(LeaderboardEntry, LEADERBOARD_COLUMNS[metric])
+    stmt = (
+        select(LeaderboardEntry)
+        .where(LeaderboardEntry.job_id == job_id, col.is_not(None))
+        .order_by(col.desc(), LeaderboardEntry.id.desc())
+        .limit(k)
+    )
+    return session.exec(stmt).all()
+
+# --- Listings (keyset pagination, newest first, large text columns never selected) ---
+def _keyset(stmt, model, after: tuple[datetime, int] | None, limit: int):
+    if after is not None:
+        ts, row_id = after
+        stmt = stmt.where(or_(model.created_at < ts, and_(model.created_at == ts, model.id < row_id)))
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+
+def _between(stmt, model, created_after: datetime | None, created_before: datetime | None):
+    if created_after is not None:
+        stmt = stmt.where(model.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(model.created_at < created_before)
+    return stmt
+
+def _title_prefix(session: Session, prefix: str):
+    """
+    Case-sensitive, byte-wise title prefix match that ix_job_title_prefix can
+    serve ('%x%' would scan every row). SQLite only uses a plain index for GLOB
+    (its LIKE ignores case); Postgres uses the text_pattern_ops index for LIKE
+    whatever the database collation is.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        escaped = "".join(f"[{c}]" if c in "*?[" else c for c in prefix)
+        return Job.title.op("GLOB")(escaped + "*")
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return Job.title.like(escaped + "%", escape="\\")
+
+def list_jobs(
+    session: Session,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    title: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    stmt = select(Job.id, Job.title, Job.created_at, Job.skills_version)
+    if title:
+        stmt = stmt.where(_title_prefix(session, title))
+    stmt = _between(stmt, Job, created_after, created_before)
+    return session.exec(_keyset(stmt, Job, after, limit)).all()
+
+def list_resumes(
+    session: Session,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    stmt = _between(select(Resume.id, Resume.created_at, Resume.version), Resume, created_after, created_before)
+    return session.exec(_keyset(stmt, Resume, after, limit)).all()
+
+def list_quizzes(
+    session: Session,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    job_id: int | None = None,
+    graded: bool | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    stmt = select(Quiz.id, Quiz.job_id, Quiz.created_at, Quiz.grades_version)
+    if job_id is not None:
+        stmt = stmt.where(Quiz.job_id == job_id)
+    if graded is not None:
+        stmt = stmt.where(Quiz.grades_version > 0 if graded else Quiz.grades_version == 0)
+    stmt = _between(stmt, Quiz, created_after, created_before)
+    return session.exec(_keyset(stmt, Quiz, after, limit)).all()
@@ -1,36 +1,113 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Index, LargeBinary, text
+from app.db.compression import CompressedText
 from typing import Optional
 from datetime import datetime
 
 class Job(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_job_created_id", "created_at", "id"),
+        Index("ix_job_title_prefix", "title", postgresql_ops={"title": "text_pattern_ops"}),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
-    jd_text: str
+    jd_text: str = Field(sa_column=Column(CompressedText, nullable=False))
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    skills_json: Optional[str] = None   # cached extracted skills (JSON list)
+    skills_version: int = 0             # bumped whenever skills_json changes
+    jd_version: int = 0                 # bumped whenever jd_text changes
 
 class Resume(SQLModel, table=True):
+    __table_args__ = (Index("ix_resume_created_id", "created_at", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
-    text: str
+    text: str = Field(sa_column=Column(CompressedText, nullable=False))
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 1                    # bumped whenever text changes
 
 class Quiz(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_quiz_created_id", "created_at", "id"),
+        Index("ix_quiz_job_created_id", "job_id", "created_at", "id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     job_id: int = Field(foreign_key="job.id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    grades_version: int = 0             # bumped whenever any answer grade changes
 
 class Question(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     quiz_id: int = Field(foreign_key="quiz.id")
     idx: int  # 0..n-1 order
-    text: str
+    text: str = Field(sa_column=Column(CompressedText, nullable=False))
 
 class Answer(SQLModel, table=True):
+    # one row per submitted version; the highest id per (quiz_id, question_id) is current
+    __table_args__ = (Index("ix_answer_quiz_question_id", "quiz_id", "question_id", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     quiz_id: int = Field(foreign_key="quiz.id")
     question_id: int = Field(foreign_key="question.id")
-    text: str
+    text: str = Field(sa_column=Column(CompressedText, nullable=False))
+    answer_hash: Optional[str] = None    # sha1 of the normalized text
+    version: int = 1
     accuracy: Optional[int] = None       # 0-5
     completeness: Optional[int] = None   # 0-5
     communication: Optional[int] = None  # 0-5
     score_pct: Optional[int] = None      # 0-100
-    tip: Optional[str] = None
\ No newline at end of file
+    tip: Optional[str] = None
+
+class BankQuestion(SQLModel, table=True):
+    # pre-generated questions per job; /quiz/start samples from here
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="job.id", index=True)
+    text: str
+    times_served: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class MatchResult(SQLModel, table=True):
+    # materialized /match payload; a row is valid only for the versions it was computed from
+    __table_args__ = (
+        Index(
+            "ux_matchresult_key",
+            "job_id", "resume_id", "quiz_id", "skills_version", "resume_version", "grades_version",
+            unique=True,
+        ),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="job.id")
+    resume_id: int = 0                  # 0 = no resume
+    quiz_id: int = 0                    # 0 = no quiz
+    skills_version: int
+    resume_version: int
+    grades_version: int
+    etag: str
+    payload: str                        # JSON
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class LeaderboardEntry(SQLModel, table=True):
+    # latest /match scores per job and candidate: the resume, or the quiz for quiz-only
+    # matches (so a cv-only and a cv+quiz match count once); ranks and top-k read from here
+    __table_args__ = (
+        Index("ux_leaderboard_resume", "job_id", "resume_id", unique=True,
+              sqlite_where=text("resume_id > 0"), postgresql_where=text("resume_id > 0")),
+        Index("ux_leaderboard_quiz_only", "job_id", "quiz_id", unique=True,
+              sqlite_where=text("resume_id = 0"), postgresql_where=text("resume_id = 0")),
+        Index("ix_leaderboard_job_quiz_id", "job_id", "quiz_id"),
+        Index("ix_leaderboard_job_combined", "job_id", "combined"),
+        Index("ix_leaderboard_job_cv", "job_id", "cv_score"),
+        Index("ix_leaderboard_job_quiz", "job_id", "quiz_score"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="job.id")
+    resume_id: int = 0                  # 0 = no resume
+    quiz_id: int = 0                    # quiz of the latest result, 0 = none
+    cv_score: Optional[float] = None
+    quiz_score: Optional[float] = None
+    combined: Optional[float] = None
+    badge: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class TextDict(SQLModel, table=True):
+    # trained zlib dictionaries for CompressedText; the newest one compresses new rows
+    id: Optional[int] = Field(default=None, primary_key=True)
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
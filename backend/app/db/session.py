@@ -1,12 +1,70 @@
+from sqlalchemy import LargeBinary, inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 from app.core.config import settings
 
 # Using SQLite (local file)
-engine = create_engine(settings.db_url, echo=True)
+engine = create_engine(settings.db_url, echo=settings.db_echo)
 
 def init_db():
     """Create tables if they don't exist yet."""
+    import app.db.models  # noqa: F401  (register tables on the metadata)
     SQLModel.metadata.create_all(engine)
+    _dedupe_leaderboard()
+    _add_missing_columns()
+    from app.db.compression import load_dicts
+    with engine.connect() as conn:
+        load_dicts(conn)
+
+# indexes replaced by another one; dropped from older databases
+_RETIRED_INDEXES = ["ix_job_title"]
+
+def _add_missing_columns():
+    """
+    create_all() never alters existing tables. Add columns/indexes introduced
+    since an app.db was created so older databases keep working. On Postgres,
+    text columns that are now CompressedText are converted to BYTEA here, so
+    the schema change ships with the code that writes compressed values.
+    """
+    from app.db.compression import CompressedText
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            have = {c["name"]: c["type"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have:
+                    if (isinstance(col.type, CompressedText) and engine.dialect.name == "postgresql"
+                            and not isinstance(have[col.name], LargeBinary)):
+                        # TEXT -> BYTEA; existing values become raw-format rows (b"\x00" + utf-8)
+                        conn.execute(text(
+                            f'ALTER TABLE "{table.name}" ALTER COLUMN "{col.name}" TYPE BYTEA '
+                            f"USING decode('00', 'hex') || convert_to(\"{col.name}\", 'UTF8')"
+                        ))
+                    continue
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col.type.compile(dialect=engine.dialect)}'
+                default = getattr(col.default, "arg", None)
+                if isinstance(default, (int, float, str)) and not isinstance(default, bool):
+                    ddl += f" DEFAULT {default!r}" if isinstance(default, str) else f" DEFAULT {default}"
+                conn.execute(text(ddl))
+            for idx in table.indexes:
+                idx.create(conn, checkfirst=True)
+        for name in _RETIRED_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+def _dedupe_leaderboard():
+    """
+    Leaderboard entries used to be keyed by (job, resume, quiz). Keep only the
+    latest entry per (job, resume) so the new unique index can be created.
+    """
+    insp = inspect(engine)
+    if any(i["name"] == "ux_leaderboard_resume" for i in insp.get_indexes("leaderboardentry")):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "DELETE FROM leaderboardentry WHERE resume_id > 0 AND EXISTS ("
+            " SELECT 1 FROM leaderboardentry b WHERE b.job_id = leaderboardentry.job_id"
+            " AND b.resume_id = leaderboardentry.resume_id AND (b.updated_at > leaderboardentry.updated_at"
+            " OR (b.updated_at = leaderboardentry.updated_at AND b.id > leaderboardentry.id)))"
+        ))
 
 def get_session():
     with Session(engine) as session:
@@ -1,5 +1,6 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 app = FastAPI(title="JobFit AI Backend")
 
 app.add_middleware(
@@ -10,17 +11,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+from app.core.profiling import ProfilingMiddleware
+app.add_middleware(ProfilingMiddleware)
+
 from app.api.routes_jd import router as jd_router
 from app.api.routes_resume import router as resume_router
 from app.api.routes_match import router as match_router
 from app.db.session import init_db
 from app.api.routes_quiz import router as quiz_router
+from app.api.routes_list import router as list_router
+from app.api.routes_admin import router as admin_router, snapshot_router
+from app.core.config import settings
+from app.api.routes_leaderboard import router as leaderboard_router
+from app.services.scheduler import Overloaded
 
 # init DB
 @app.on_event("startup")
 def on_startup():
     init_db()
 
+@app.exception_handler(Overloaded)
+def overloaded(request: Request, exc: Overloaded):
+    # LLM queue full: tell the client when to come back instead of letting it time out
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
 
 
 @app.get("/")
@@ -31,7 +45,35 @@ def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def get_metrics():
+    from app.core.metrics import metrics
+    return metrics.snapshot()
+
+@app.get("/health/llm")
+def health_llm():
+    from app.services.lc import get_router
+    from app.services.resilience import breaker_status
+    from app.services.scheduler import get_scheduler
+    backends = get_router().status()
+    breakers = breaker_status()
+    # an open background breaker delays bank fills but degrades no response
+    ok = any(b["healthy"] for b in backends) and all(
+        b["state"] != "open" for name, b in breakers.items() if not name.endswith(".background")
+    )
+    return {
+        "status": "ok" if ok else "degraded",
+        "backends": backends,
+        "breakers": breakers,
+        "scheduler": get_scheduler().status(),
+    }
+
 app.include_router(jd_router)
 app.include_router(resume_router)
 app.include_router(match_router)
 app.include_router(quiz_router)
+app.include_router(list_router)
+app.include_router(leaderboard_router)
+app.include_router(admin_router)
+if settings.admin_token:
+    app.include_router(snapshot_router)
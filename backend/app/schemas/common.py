@@ -22,6 +22,7 @@ class QuizStartIn(BaseModel):
 class QuizStartOut(BaseModel):
     quiz_id: int
     questions: List[Dict]  # [{id, idx, text}]
+    degraded: bool = False # LLM unavailable: template questions
 
 class QuizGradeIn(BaseModel):
     quiz_id: int
@@ -45,3 +46,4 @@ class QuizGradeOut(BaseModel):
     overall: float
     feedback: List[QuizFeedbackItem]
     quiz_match: Optional[QuizMatch] = None
+    degraded: bool = False # LLM unavailable: heuristic grades, not stored
@@ -1,31 +1,68 @@
 # app/services/aligner.py
 from typing import List, Dict
-import json, re
-from app.services.lc import get_retriever, make_skill_chain
-
-def _parse_json(text: str):
-    # tolerant JSON cleanup (handles fenced code blocks)
-    t = text.strip()
-    t = re.sub(r"^```(?:json)?|```$", "", t, flags=re.I | re.M).strip()
-    try:
-        return json.loads(t)
-    except Exception:
-        return []
+import re
+from collections import Counter
+from functools import lru_cache
+from sqlmodel import Session
+from app.db import crud
+from app.core.config import settings
+from app.services import resilience
+from app.services.lc import make_skill_chain
+from app.services.context import compress, get_context
 
 # --- Skill extraction from JD via LangChain ---
-def extract_jd_skills_langchain(job_id: int, top_k_ctx: int = 6) -> List[Dict]:
-    retriever = get_retriever(job_id, k=top_k_ctx)
-    # pull context by asking a general query
-    docs = retriever.invoke("key skills, requirements, and tech stack")
-    ctx = "\n\n".join([d.page_content for d in docs]) if docs else ""
+SKILL_QUERY = "key skills, requirements, and tech stack"
+
+_TECH_TOKEN = re.compile(r"[A-Za-z][A-Za-z0-9+#./-]*[A-Za-z0-9+#]|[A-Za-z]")
+_MUST_CUES = re.compile(r"\b(required|must|mandatory|minimum|\d+\+?\s*years?)\b", flags=re.I)
+_NOT_SKILLS = {
+    "we", "us", "you", "our", "the", "a", "an", "and", "or", "in", "with", "for", "of", "to", "on", "at",
+    "senior", "junior", "lead", "engineer", "developer", "team", "experience", "requirements",
+    "responsibilities", "qualifications", "skills", "benefits", "strong", "plus", "bonus", "nice",
+    "must", "ability", "knowledge", "years", "role", "job", "company", "work", "remote",
+}
+
+def heuristic_skills(ctx: str) -> List[Dict]:
+    """
+    Keyword fallback when the skill chain is unavailable: tech-shaped tokens
+    (Python, CI/CD, Node.js, S3) ranked by frequency. A capitalized word only
+    counts if it also appears capitalized mid-sentence ("Design ..." doesn't).
+    Never cached on the job.
+    """
+    counts: Counter = Counter()
+    canon: Dict[str, str] = {}
+    qualified: set = set()
+    must: set = set()
+    for sent in re.split(r"(?<=[.!?;:])\s+|\n+|\s[-•*]\s", ctx or ""):
+        cue = bool(_MUST_CUES.search(sent))
+        for pos, tok in enumerate(_TECH_TOKEN.findall(sent)):
+            key = tok.casefold()
+            if key in _NOT_SKILLS or (len(tok) < 2 and tok not in ("C", "R")):
+                continue
+            shaped = any(c.isdigit() for c in tok) or any(c in tok for c in "+#/.") or tok[1:].lower() != tok[1:]
+            if shaped or (tok[0].isupper() and pos > 0):
+                qualified.add(key)
+            elif not tok[0].isupper():
+                continue
+            counts[key] += 1
+            canon.setdefault(key, tok)
+            if cue:
+                must.add(key)
+    ranked = [(k, n) for k, n in counts.most_common() if k in qualified][:15]
+    return [{"skill": canon[k], "importance": min(5, 2 + n), "must_have": k in must} for k, n in ranked]
 
-    chain = make_skill_chain()
-    raw = chain.invoke(ctx)  # llm returns a string or object
-    items = _parse_json(getattr(raw, "content", str(raw)))
+def _skills_from_context(ctx: str) -> List[Dict]:
+    try:
+        items = make_skill_chain().invoke({"context": ctx}) or []
+    except resilience.Degraded as e:
+        resilience.note_fallback("skills", e.reason)
+        return heuristic_skills(ctx)
 
     # dedupe + clamp
     seen = {}
     for it in items:
+        if not isinstance(it, dict):
+            continue
         s = str(it.get("skill", "")).strip()
         if not s:
             continue
@@ -41,6 +78,37 @@ def extract_jd_skills_langchain(job_id: int, top_k_ctx: int = 6) -> List[Dict]:
     # limit to 15 to keep scoring stable
     return list(seen.values())[:15]
 
+def extract_jd_skills_langchain(job_id: int, top_k_ctx: int = 6) -> List[Dict]:
+    # pull context by asking a general query (compressed, cached per job+query)
+    ctx = get_context(job_id, SKILL_QUERY, k=top_k_ctx, budget_tokens=settings.context_budget_skills)
+    return _skills_from_context(ctx)
+
+def extract_skills_from_text(jd_text: str) -> List[Dict]:
+    """
+    Same extraction for a JD that was never indexed (batch scoring from files):
+    the whole text is compressed instead of retrieved.
+    """
+    if settings.context_compression:
+        ctx = compress(SKILL_QUERY, [jd_text], settings.context_budget_skills)
+    else:
+        ctx = jd_text
+    return _skills_from_context(ctx)
+
+def get_job_skills(session: Session, job_id: int, top_k_ctx: int = 6) -> List[Dict]:
+    """
+    Skills for a job, extracted once and cached on the Job row.
+    Re-extracts only after the cache is cleared (e.g. the JD changed).
+    Keyword fallback skills (LLM degraded) are returned but not cached.
+    """
+    cached = crud.get_job_skills(session, job_id)
+    if cached is not None:
+        return cached
+    with resilience.track() as fallbacks:
+        skills = extract_jd_skills_langchain(job_id, top_k_ctx=top_k_ctx)
+    if skills and not fallbacks:
+        crud.set_job_skills(session, job_id, skills)
+    return skills
+
 # --- Matching helpers ---
 _ALIASES = [
     # tuples of equivalent spellings to improve simple matching
@@ -74,32 +142,45 @@ def _mk_variants(skill: str) -> List[str]:
         variants.add(s.replace(" ", ""))
     return list(variants)
 
+@lru_cache(maxsize=4096)
+def _skill_patterns(skill: str) -> List[tuple]:
+    return [(v, re.compile(rf"(?:\b|^){re.escape(v)}(?:\b|$)")) for v in _mk_variants(skill)]
+
+def _present_normalized(skill: str, body: str) -> bool:
+    # str.find is much cheaper than the regex scan; only run the regex from the first occurrence on
+    for v, pat in _skill_patterns(skill):
+        i = body.find(v)
+        if i >= 0 and pat.search(body, i):
+            return True
+    return False
+
 def _present(skill: str, text: str) -> bool:
     """
     Token-aware, alias-aware presence check (still lightweight).
     Uses word boundaries for words; for tech tokens (with dots/slashes) allow loose match.
     """
-    body = _normalize(text)
-    for v in _mk_variants(skill):
-        v_norm = re.escape(v)
-        if re.search(rf"(?:\b|^){v_norm}(?:\b|$)", body):
-            return True
-    return False
+    return _present_normalized(skill, _normalize(text))
 
 # --- Scoring ---
-def score_resume_against_skills(resume_text: str, skills: List[Dict]) -> Dict:
+def normalize_resume(text: str) -> str:
+    """Normalized text for score_resume_against_skills(..., normalized=True)."""
+    return _normalize(text)
+
+def score_resume_against_skills(resume_text: str, skills: List[Dict], normalized: bool = False) -> Dict:
+    # normalized: resume_text is already normalize_resume()d (batch scoring, one resume vs many jobs)
     score = 0.0
     total = 0.0
     gaps: List[str] = []
     matched_count = 0
 
+    body = resume_text if normalized else _normalize(resume_text)  # once, not once per skill
     for s in skills:
         w = 1.0 + 0.5 * (int(s.get("importance", 3)) - 1)
         if s.get("must_have", False):
             w += 1.0
         total += w
 
-        if _present(s["skill"], resume_text):
+        if _present_normalized(s["skill"], body):
             score += w
             matched_count += 1
         else:
@@ -0,0 +1,160 @@
+# app/services/context.py
+"""
+Context compression between retrieval and the chains.
+
+Retrieved JD chunks carry a lot of text the model doesn't need (benefits,
+company blurb, EEO statements) and repeat each other thanks to the 120-char
+chunk_overlap. get_context() retrieves, then:
+  1. drops boilerplate sections/sentences,
+  2. dedupes sentences (including overlap fragments contained in another sentence),
+  3. keeps the sentences most relevant to the query under a token budget,
+     in their original order.
+Results are cached per (job, query, k, budget) for context_cache_ttl_s; call
+clear_job() when a JD changes. The TTL bounds how long other worker processes,
+whose caches clear_job() can't reach, keep serving an old JD's context.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.lc import get_retriever
+
+_BOILER_HEADINGS = re.compile(
+    r"^\W*(benefits|perks|what we offer|we offer|about us|about the (company|team)|who we are|our (mission|values|culture|story)"
+    r"|equal (employment )?opportunity|eeo|diversity|compensation|salary|pay range|how to apply|why join|life at)\b",
+    flags=re.I,
+)
+_CONTENT_HEADINGS = re.compile(
+    r"^\W*(requirements|qualifications|responsibilities|skills|what you('ll| will) (do|bring)|you have|must have|nice to have"
+    r"|preferred|tech stack|the role|your role|experience)\b",
+    flags=re.I,
+)
+_BOILER_SENTENCE = re.compile(
+    r"equal opportunity|without regard to|regardless of (race|gender|age)|reasonable accommodation|protected veteran"
+    r"|401\(?k\)?|paid time off|\bpto\b|health (insurance|benefits)|dental|parental leave|stock options|apply (now|today)"
+    r"|we are (a|an) .{0,40}(company|startup|leader)|e-verify",
+    flags=re.I,
+)
+_REQ_CUES = re.compile(r"\b(experience|required|must|years?|proficien\w*|knowledge|familiar\w*|strong|hands-on|expert\w*)\b", flags=re.I)
+_STOP = set(
+    "the a an and or for to of in on with at by is are be as you your we our this that it key job relevant "
+    "have has how many much what do does did if yes any".split()
+)
+
+_cache: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()  # key -> (stored at, context)
+_cache_lock = threading.Lock()
+
+metrics.register_ratio("context.kept_ratio", "context.tokens_out", "context.tokens_in")
+metrics.register_ratio("context.cache_hit_rate", "context.cache_hit", "context.requests")
+
+
+def approx_tokens(text: str) -> int:
+    # ~4 chars/token for English prose with a Llama/Mistral tokenizer; good enough for budgeting
+    return (len(text) + 3) // 4
+
+
+def _norm(s: str) -> str:
+    s = re.sub(r"^[\s\-*•·\d.)]+", "", s.casefold())
+    return " ".join(re.findall(r"[\w+#./]+", s))
+
+
+def _terms(text: str) -> set:
+    return {t for t in re.findall(r"[a-z0-9][a-z0-9+#./-]*", text.casefold()) if t not in _STOP and len(t) > 1}
+
+
+def _sentences(chunk: str) -> List[str]:
+    """Sentences of one chunk with boilerplate sections and sentences removed."""
+    out: List[str] = []
+    in_boiler = False
+    for line in chunk.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        short = len(line.split()) <= 6
+        if short and _BOILER_HEADINGS.search(line):
+            in_boiler = True
+            continue
+        if short and (_CONTENT_HEADINGS.search(line) or line.endswith(":")):
+            in_boiler = False
+        if in_boiler:
+            continue
+        for sent in re.split(r"(?<=[.!?;])\s+", line):
+            sent = sent.strip()
+            if sent and not _BOILER_SENTENCE.search(sent):
+                out.append(sent)
+    return out
+
+
+def compress(query: str, chunks: List[str], budget_tokens: int) -> str:
+    # 1+2) clean and dedupe; keep the first occurrence in retrieval order
+    sents: List[Tuple[str, str]] = []  # (text, normalized)
+    seen = set()
+    for chunk in chunks:
+        for s in _sentences(chunk):
+            n = _norm(s)
+            if n and n not in seen:
+                seen.add(n)
+                sents.append((s, n))
+    # overlap fragments: a chunk boundary often cuts a sentence that appears whole elsewhere
+    sents = [
+        (s, n) for i, (s, n) in enumerate(sents)
+        if not any(i != j and len(n) < len(m) and n in m for j, (_, m) in enumerate(sents))
+    ]
+
+    # 3) rank by overlap with the query, with a nudge for requirement-like sentences
+    q = _terms(query)
+    scored = []
+    for pos, (s, _) in enumerate(sents):
+        t = _terms(s)
+        score = 2.0 * len(q & t) + (1.0 if _REQ_CUES.search(s) else 0.0)
+        score += 0.5 * sum(1 for tok in re.findall(r"\S+", s) if any(c.isupper() or c in "+#/" for c in tok[1:]))
+        scored.append((score, pos, s))
+
+    keep, used = [], 0
+    for score, pos, s in sorted(scored, key=lambda x: (-x[0], x[1])):
+        cost = approx_tokens(s) + 1
+        if used + cost > budget_tokens:
+            continue
+        keep.append((pos, s))
+        used += cost
+    if not keep and scored:
+        # one unpunctuated wall of text: truncate the best sentence instead of returning nothing
+        best = min(scored, key=lambda x: (-x[0], x[1]))[2]
+        return best[: budget_tokens * 4]
+    return "\n".join(s for _, s in sorted(keep))
+
+
+def get_context(job_id: int, query: str, k: int, budget_tokens: int) -> str:
+    """Retrieve k chunks for `query` and return the compressed context string."""
+    metrics.incr("context.requests")
+    key = (job_id, query, k, budget_tokens)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < settings.context_cache_ttl_s:
+            _cache.move_to_end(key)
+            metrics.incr("context.cache_hit")
+            return hit[1]
+
+    docs = get_retriever(job_id, k=k).invoke(query)
+    chunks = [getattr(d, "page_content", "") for d in (docs or [])]
+    raw = "\n\n".join(chunks)
+    ctx = compress(query, chunks, budget_tokens) if settings.context_compression else raw
+
+    metrics.incr("context.tokens_in", approx_tokens(raw))
+    metrics.incr("context.tokens_out", approx_tokens(ctx))
+    with _cache_lock:
+        _cache[key] = (time.monotonic(), ctx)
+        _cache.move_to_end(key)
+        while len(_cache) > settings.context_cache_size:
+            _cache.popitem(last=False)
+    return ctx
+
+
+def clear_job(job_id: int):
+    with _cache_lock:
+        for key in [k for k in _cache if k[0] == job_id]:
+            del _cache[key]
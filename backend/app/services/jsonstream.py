@@ -0,0 +1,103 @@
+# app/services/jsonstream.py
+"""
+Incremental JSON extraction from LLM output.
+
+JsonStream is fed text chunks as they arrive and reports done as soon as the
+first complete top-level array/object has been seen, so the caller can stop
+the generation instead of paying for whatever the model adds afterwards (a
+closing remark, a second fenced block, or whitespace padding up to
+num_predict, which format=json is known for).
+
+Leading prose and ```json fences are skipped. If the output is cut off in the
+middle of an array, value() returns the elements that did complete rather
+than nothing.
+
+    parser = JsonStream(list)
+    for chunk in llm.stream(prompt):
+        if parser.feed(chunk.content):
+            break
+    items = parser.value()   # None if nothing usable was produced
+"""
+import json
+from typing import Any, List, Optional
+
+_OPENERS = {list: "[", dict: "{", None: "[{"}
+
+
+def _coerce(value: Any, expect: Optional[type]) -> Any:
+    """Unwrap the usual near-misses: {"items": [...]} for a list, [{...}] for an object."""
+    if expect is list and isinstance(value, dict):
+        inner = [v for v in value.values() if isinstance(v, list)]
+        return inner[0] if len(inner) == 1 else [value]
+    if expect is dict and isinstance(value, list):
+        return value[0] if value and isinstance(value[0], dict) else None
+    return value
+
+
+class JsonStream:
+    def __init__(self, expect: Optional[type] = None):
+        self.expect = expect
+        self._openers = _OPENERS[expect]
+        self.done = False
+        self._reset()
+
+    def _reset(self):
+        self._buf: List[str] = []
+        self._stack: List[str] = []
+        self._in_str = False
+        self._esc = False
+        self._cut = 0          # buffer length at the end of the last complete top-level array element
+        self._value: Any = None
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk; True once a complete value is available (stop reading then)."""
+        for ch in chunk or "":
+            if self.done:
+                break
+            if not self._stack:
+                if ch not in self._openers:
+                    continue  # prose / fences before the value
+                self._buf.append(ch)
+                self._stack.append(ch)
+                continue
+            self._buf.append(ch)
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = True
+            elif ch in "[{":
+                self._stack.append(ch)
+            elif ch in "]}":
+                self._stack.pop()
+                if not self._stack:
+                    self._finish()
+                elif len(self._stack) == 1 and self._stack[0] == "[":
+                    self._cut = len(self._buf)
+            elif ch == "," and len(self._stack) == 1 and self._stack[0] == "[":
+                self._cut = len(self._buf) - 1
+        return self.done
+
+    def _finish(self):
+        try:
+            self._value = json.loads("".join(self._buf))
+            self.done = True
+        except ValueError:
+            # e.g. "[see below]" in prose before the real JSON: keep scanning
+            self._reset()
+
+    def value(self) -> Any:
+        """The parsed value, a salvaged prefix of a truncated array, or None."""
+        if self.done:
+            return _coerce(self._value, self.expect)
+        if self._stack[:1] == ["["] and self._cut:
+            try:
+                return _coerce(json.loads("".join(self._buf[: self._cut]) + "]"), self.expect)
+            except ValueError:
+                return None
+        return None
@@ -1,24 +1,195 @@
 # app/services/lc.py
-from typing import List
-from langchain_ollama import ChatOllama
+import contextvars
+import hashlib
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Dict, Iterator, List
+import httpx
+import numpy as np
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
-from langchain.schema.runnable import RunnablePassthrough
 from langchain.prompts import PromptTemplate
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.jsonstream import JsonStream
+from app.services.vectors import NumpyVectorStore
+from app.services.llm_router import LLMRouter, RoutedChatModel, router_from_config
+from app.services.resilience import Deadline, Degraded, get_breaker, request_degraded
+from app.services.scheduler import Overloaded, current_class, get_scheduler
 
 # ---- Constants ----
 PERSIST_ROOT = "chroma_db"  # single root used for both indexing + retrieval
 
 # ---- LLM ----
-def get_llm():
-    # Any local model you pulled with Ollama works here
+_router: LLMRouter | None = None
+_router_lock = threading.Lock()
+
+def get_router() -> LLMRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = router_from_config(
+                settings.llm_backends,
+                health_interval=settings.llm_health_interval,
+                retries=settings.llm_retries,
+                acquire_timeout=settings.llm_acquire_timeout,
+                read_timeout=settings.llm_read_timeout,
+            )
+            _router.start_health_checks()
+        return _router
+
+def get_llm(chain: str = "default"):
+    # Any local model you pulled with Ollama works here, configured via settings.llm_backends
     # e.g., "mistral:7b-instruct-q4_0" or "llama3.1:8b-instruct-q4_0"
-    return ChatOllama(model="mistral:latest", temperature=0.2)
+    pool = settings.llm_chain_pools.get(chain, "default")
+    return RoutedChatModel(get_router(), pool)
+
+def _admit():
+    # a scheduler slot per generation, classed by the calling request (see scheduler.priority)
+    return get_scheduler().slot() if settings.scheduler_enabled else nullcontext()
+
+_END = object()
+
+
+def _until(deadline: Deadline, chunks: Iterator) -> Iterator:
+    """
+    Yield from `chunks` until the deadline, raising Degraded when it passes even
+    if the model is stalled mid-read. The stream is read on a helper thread; a
+    read blocked at the deadline is abandoned and the helper closes the stream
+    (freeing the backend slot) once that read returns or hits llm_read_timeout.
+    """
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    stop = threading.Event()
+
+    def pump():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                q.put(chunk)
+            q.put(_END)
+        except BaseException as e:
+            q.put(e)
+        finally:
+            chunks.close()
+
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(pump,), name="llm-stream", daemon=True).start()
+    try:
+        while True:
+            try:
+                item = q.get(timeout=max(0.0, deadline.expires - time.monotonic()))
+            except queue.Empty:
+                deadline.check()
+                continue
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class JsonChain:
+    """
+    prompt -> routed LLM -> parsed JSON.
+
+    With llm_structured_output the chain's JSON schema is sent as Ollama's
+    `format`, so decoding can't wander into prose or fences. The reply is
+    streamed through JsonStream and the stream is closed as soon as the value
+    is complete. Unusable output is retried up to llm_json_retries times;
+    invoke() returns None if every attempt failed.
+
+    Generation is bounded by llm_deadlines[name], also while waiting for the
+    next chunk (see _until). Chains that ask for a list (`per_item` names the
+    input with its length) get proportionally longer past llm_deadline_items.
+    Calls also pass the circuit breaker of their pool and priority class
+    (resilience.py): a timeout, backend error or open breaker raises Degraded,
+    and the caller falls back.
+    """
+
+    def __init__(self, name: str, prompt: PromptTemplate, schema, expect: type, per_item: str | None = None):
+        self.name = name
+        self.prompt = prompt
+        self.schema = schema      # dict, or callable(inputs) -> dict
+        self.expect = expect
+        self.per_item = per_item  # input key with the number of items asked for
+
+    def _deadline_s(self, inputs: Dict) -> float:
+        seconds = settings.llm_deadlines.get(self.name, 30.0)
+        if self.per_item:
+            seconds *= max(1.0, int(inputs.get(self.per_item) or 0) / settings.llm_deadline_items)
+        return seconds
+
+    def invoke(self, inputs: Dict):
+        metrics.incr(f"llm.calls.{self.name}")
+        if request_degraded():
+            raise Degraded("skipped", "an earlier LLM call in this request already fell back")
+        # one breaker per pool and priority class: timeouts of long background
+        # generations must not open the breaker in front of interactive calls
+        breaker = get_breaker(f'{settings.llm_chain_pools.get(self.name, "default")}.{current_class()}')
+        breaker.allow()
+        try:
+            value = self._generate(inputs)
+        except Overloaded:
+            breaker.cancel()  # never reached the backend
+            raise
+        except Degraded:
+            breaker.failure()
+            raise
+        except httpx.TimeoutException as e:
+            breaker.failure()
+            raise Degraded("timeout", f"no data from Ollama for {settings.llm_read_timeout:g}s") from e
+        except Exception as e:
+            breaker.failure()
+            raise Degraded("error", f"{type(e).__name__}: {e}") from e
+        breaker.success()  # the backend answered, even if the JSON was unusable
+        return value
+
+    def _generate(self, inputs: Dict):
+        llm = get_llm(self.name)
+        prompt_value = self.prompt.invoke(inputs)
+        kwargs = {}
+        if settings.llm_structured_output:
+            kwargs["format"] = self.schema(inputs) if callable(self.schema) else self.schema
+        deadline = None
+        for attempt in range(settings.llm_json_retries + 1):
+            if attempt:
+                if deadline.expired():
+                    break
+                metrics.incr(f"llm.json.retry.{self.name}")
+            parser = JsonStream(self.expect)
+            with _admit():
+                # the deadline covers generation; queueing is bounded by scheduler_max_wait
+                deadline = deadline or Deadline(self._deadline_s(inputs))
+                chunks = _until(deadline, llm.stream(prompt_value, **kwargs))
+                try:
+                    for chunk in chunks:
+                        if parser.feed(getattr(chunk, "content", str(chunk))):
+                            metrics.incr(f"llm.json.early_stop.{self.name}")
+                            break
+                finally:
+                    chunks.close()
+            value = parser.value()
+            if value:
+                metrics.incr(f"llm.json.ok.{self.name}")
+                return value
+            metrics.incr(f"llm.json.parse_failed.{self.name}")
+        return None
 
 # ---- Embeddings ----
+@lru_cache(maxsize=1)
 def get_embedder():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    # loading MiniLM is the slowest part of opening a store; do it once per process
+    if settings.embedding_model.startswith("fake:"):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=int(settings.embedding_model.split(":", 1)[1]))
+    return HuggingFaceEmbeddings(model_name=settings.embedding_model)
 
 # ---- Vector store per Job ----
 def collection_name_for_job(job_id: int) -> str:
@@ -27,17 +198,31 @@ def collection_name_for_job(job_id: int) -> str:
 def persist_dir_for_job(job_id: int) -> str:
     return f"{PERSIST_ROOT}/job_{job_id}"
 
-def get_vectorstore(job_id: int) -> Chroma:
+def get_vectorstore(job_id: int):
     """
     Open the SAME collection + persist directory used during indexing.
+    settings.vector_backend picks Chroma (default) or the in-process NumPy store.
     """
     embeddings = get_embedder()
+    if settings.vector_backend == "numpy":
+        return NumpyVectorStore(job_id, embeddings, settings.vector_root)
     return Chroma(
         collection_name=collection_name_for_job(job_id),
         embedding_function=embeddings,
         persist_directory=persist_dir_for_job(job_id),
     )
 # ---- Indexing ----
+def split_job_description(jd_text: str) -> List[str]:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=900, chunk_overlap=120, separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    # dict.fromkeys: identical chunks would collide on their content-hash id
+    return list(dict.fromkeys(c for c in splitter.split_text(jd_text) if c.strip()))
+
+def chunk_id(chunk: str) -> str:
+    # content-addressed ids let re-indexing diff chunk sets without re-embedding
+    return hashlib.sha1(chunk.encode("utf-8")).hexdigest()
+
 def index_job_description(job_id: int, jd_text: str):
     """
     Chunk the JD and index into a collection specific to the job.
@@ -46,27 +231,18 @@ def index_job_description(job_id: int, jd_text: str):
     persist_directory is provided—no .persist() call exists.
     """
     print(f"⚡ Starting index_job_description for job {job_id}")
-    embeddings = get_embedder()
-    persist_dir = persist_dir_for_job(job_id)
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=900, chunk_overlap=120, separators=["\n\n", "\n", ". ", " ", ""]
-    )
-    chunks: List[str] = [c for c in splitter.split_text(jd_text) if c.strip()]
+    chunks = split_job_description(jd_text)
 
     try:
-        vs = Chroma(
-            collection_name=collection_name_for_job(job_id),
-            embedding_function=embeddings,
-            persist_directory=persist_dir,
-        )
+        vs = get_vectorstore(job_id)
 
         if chunks:
             # add_texts writes to the persistent DB immediately in this integration
-            vs.add_texts(chunks)
+            vs.add_texts(chunks, ids=[chunk_id(c) for c in chunks])
 
         print(
-            f"✅ Chroma store ready at {persist_dir} "
+            f"✅ {settings.vector_backend} store ready for job {job_id} "
             f"(collection={collection_name_for_job(job_id)}, chunks={len(chunks)})"
         )
         return vs
@@ -76,6 +252,78 @@ def index_job_description(job_id: int, jd_text: str):
         traceback.print_exc()
         raise e
 
+def reindex_job_description(job_id: int, jd_text: str) -> Dict[str, int]:
+    """
+    Bring the job's collection in line with a new JD text: embed only chunks
+    that aren't stored yet and delete the ones that disappeared.
+    Stored rows are matched by content hash, so collections indexed before
+    content-addressed ids (random uuids) are diffed correctly too.
+    """
+    chunks = split_job_description(jd_text)
+    wanted = {chunk_id(c): c for c in chunks}
+
+    vs = get_vectorstore(job_id)
+    stored = vs.get(include=["documents"])
+    have = set()
+    stale: List[str] = []
+    for sid, doc in zip(stored.get("ids", []), stored.get("documents", [])):
+        h = chunk_id(doc or "")
+        if h in wanted and h not in have:
+            have.add(h)
+        else:
+            stale.append(sid)
+
+    new = [h for h in wanted if h not in have]
+    # add before deleting: if embedding fails, the old chunks are still all there
+    if new:
+        vs.add_texts([wanted[h] for h in new], ids=new)
+    if stale:
+        vs.delete(ids=stale)
+    print(f"♻️ reindexed job {job_id}: +{len(new)} -{len(stale)} ={len(have)}")
+    return {"added": len(new), "removed": len(stale), "unchanged": len(have)}
+
+
+def export_job_vectors(job_id: int) -> Dict:
+    """Stored chunks with their vectors: {"ids", "documents", "embeddings" (float32 [n, dim])}."""
+    got = get_vectorstore(job_id).get(include=["documents", "embeddings"])
+    ids = list(got.get("ids") or [])
+    emb = got.get("embeddings")
+    mat = np.asarray(emb if emb is not None and len(ids) else np.zeros((0, 0)), dtype=np.float32)
+    return {"ids": ids, "documents": list(got.get("documents") or []), "embeddings": mat}
+
+def job_vector_ids(job_id: int) -> List[str]:
+    return list(get_vectorstore(job_id).get().get("ids") or [])
+
+def _chroma_collection(job_id: int):
+    """
+    The job's chromadb collection, through chromadb's public client API: the
+    LangChain wrapper can only add texts it embeds itself. Opened after
+    get_vectorstore() created it, with no embedding function of its own
+    (vectors are always passed in).
+    """
+    import chromadb
+    client = chromadb.PersistentClient(path=persist_dir_for_job(job_id))
+    return client.get_collection(collection_name_for_job(job_id), embedding_function=None)
+
+def import_job_vectors(job_id: int, ids: List[str], texts: List[str], vectors) -> Dict[str, int]:
+    """
+    Make the job's store hold exactly these chunks, using the given vectors
+    instead of embedding the texts again (snapshot import).
+    """
+    vs = get_vectorstore(job_id)
+    keep = set(ids)
+    stale = [i for i in job_vector_ids(job_id) if i not in keep]
+    # write before deleting: a failed write leaves the previous chunks in place
+    if ids:
+        if isinstance(vs, NumpyVectorStore):
+            vs.add_embeddings(texts, vectors, ids=ids)
+        else:
+            _chroma_collection(job_id).upsert(ids=ids, embeddings=np.asarray(vectors, dtype=np.float32),
+                                              documents=texts)
+    if stale:
+        vs.delete(ids=stale)
+    return {"chunks": len(ids), "removed": len(stale)}
+
 
 # ---- Retriever ----
 def get_retriever(job_id: int, k: int = 4):
@@ -103,9 +351,23 @@ JD CONTEXT:
 """.strip()
 )
 
-def make_skill_chain():
-    llm = get_llm()
-    return ({"context": RunnablePassthrough()} | skill_prompt | llm)
+SKILLS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "skill": {"type": "string"},
+            "importance": {"type": "integer", "minimum": 1, "maximum": 5},
+            "must_have": {"type": "boolean"},
+        },
+        "required": ["skill", "importance", "must_have"],
+    },
+    "maxItems": 15,
+}
+
+def make_skill_chain() -> JsonChain:
+    # input is {"context"}
+    return JsonChain("skills", skill_prompt, SKILLS_SCHEMA, list)
 
 # 2) Quiz question generation
 quiz_prompt = PromptTemplate.from_template(
@@ -131,9 +393,18 @@ JD CONTEXT:
 """.strip()
 )
 
-def make_quiz_chain():
-    llm = get_llm()
-    return ({"context": RunnablePassthrough(), "n": RunnablePassthrough()} | quiz_prompt | llm)
+def _quiz_schema(inputs: Dict) -> Dict:
+    n = int(inputs.get("n") or 5)
+    return {
+        "type": "array",
+        "items": {"type": "object", "properties": {"q": {"type": "string"}}, "required": ["q"]},
+        "minItems": n,
+        "maxItems": n,  # exactly n: no tokens spent on questions we'd drop
+    }
+
+def make_quiz_chain() -> JsonChain:
+    # input is {"context", "n"}
+    return JsonChain("quiz", quiz_prompt, _quiz_schema, list, per_item="n")
 
 # 3) Grading chain
 
@@ -169,14 +440,19 @@ Return ONLY JSON in this format:
 )
 
 
-def make_grade_chain():
-    llm = get_llm()
-    return (
-        {
-            "context": RunnablePassthrough(),
-            "question": RunnablePassthrough(),
-            "answer": RunnablePassthrough(),
-        }
-        | grade_prompt
-        | llm
-    )
+_SCORE_0_5 = {"type": "integer", "minimum": 0, "maximum": 5}
+GRADE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "relevance": _SCORE_0_5,
+        "qualification": _SCORE_0_5,
+        "communication": _SCORE_0_5,
+        "qualified": {"type": "boolean"},
+        "tip": {"type": "string"},
+    },
+    "required": ["relevance", "qualification", "communication", "qualified", "tip"],
+}
+
+def make_grade_chain() -> JsonChain:
+    # input is {"context", "question", "answer"}
+    return JsonChain("grade", grade_prompt, GRADE_SCHEMA, dict)
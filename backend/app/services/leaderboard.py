@@ -0,0 +1,211 @@
+# app/services/leaderboard.py
+"""
+Per-job candidate leaderboard fed by /match.
+
+Every computed match result is upserted into the LeaderboardEntry table, one
+row per job and candidate: the resume, or the quiz for a quiz-only match. The
+latest result wins, except that a result without a quiz doesn't replace one
+with a quiz (it would drop the quiz and combined scores), and a quiz-only
+result is ignored when that quiz is already ranked with a resume. A
+resume+quiz result removes the quiz's quiz-only row. Top-k is read straight from the
+(job_id, score) indexes. Rank, percentile, quantiles and histograms come from
+an in-memory Fenwick tree per job and metric over 0.0-100.0 in 0.1 steps
+(scores are already rounded to that), so each is O(log n) in the number of
+buckets and never scans the candidates.
+
+A job's trees are built from the table on first use and then updated in place
+on every record(). With several worker processes each one only sees its own
+updates in between, so trees older than LEADERBOARD_RESYNC_S are rebuilt.
+
+    leaderboard.record(session, job_id, resume_id, quiz_id, result)
+    leaderboard.rank(session, job_id, "combined", 72.5)
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db import crud
+
+METRICS = list(crud.LEADERBOARD_COLUMNS)  # combined, cv, quiz
+RESOLUTION = 10                           # buckets per point: 0.1
+_BUCKETS = 100 * RESOLUTION + 1
+
+
+def _bucket(score: float) -> int:
+    return min(max(int(round(score * RESOLUTION)), 0), _BUCKETS - 1)
+
+
+class Fenwick:
+    """Counts per bucket with O(log n) update, prefix sum and k-th lookup."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.tree = [0] * (n + 1)
+        self.total = 0
+        self._top = 1 << n.bit_length()
+
+    def add(self, i: int, delta: int = 1):
+        self.total += delta
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i: int) -> int:
+        """Count in buckets 0..i (inclusive); 0 for i < 0."""
+        i = min(i, self.n - 1) + 1
+        s = 0
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+    def kth(self, k: int) -> int:
+        """Smallest bucket whose prefix count reaches k (1-based)."""
+        pos, step = 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] < k:
+                pos = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return pos  # 0-based index of the bucket containing the k-th item
+
+
+class _Board:
+    def __init__(self, trees: Dict[str, Fenwick]):
+        self.trees = trees
+        self.built = time.monotonic()
+
+
+_boards: Dict[int, _Board] = {}
+_lock = threading.Lock()
+
+
+def _build(session: Session, job_id: int) -> _Board:
+    trees = {}
+    for m in METRICS:
+        t = Fenwick(_BUCKETS)
+        for score in crud.leaderboard_scores(session, job_id, m):
+            t.add(_bucket(score))
+        trees[m] = t
+    metrics.incr("leaderboard.rebuild")
+    return _Board(trees)
+
+
+def _board(session: Session, job_id: int) -> _Board:
+    with _lock:
+        b = _boards.get(job_id)
+        if b is not None and time.monotonic() - b.built < settings.leaderboard_resync_s:
+            return b
+    b = _build(session, job_id)  # outside the lock: one DB read per metric
+    with _lock:
+        _boards[job_id] = b
+    return b
+
+
+def clear_job(session: Session, job_id: int):
+    """Drop a job's rankings, e.g. when its JD changes; other workers catch up on resync."""
+    crud.clear_leaderboard(session, job_id)
+    with _lock:
+        _boards.pop(job_id, None)
+
+
+def _scores(result: dict) -> Dict[str, Optional[float]]:
+    return {
+        "combined": result.get("combined"),
+        "cv": (result.get("cv_match") or {}).get("score"),
+        "quiz": (result.get("quiz_match") or {}).get("score"),
+    }
+
+
+def record(session: Session, job_id: int, resume_id: int, quiz_id: int, result: dict):
+    """Upsert a /match result and apply the score change to the in-memory trees."""
+    new = _scores(result)
+    if resume_id and not quiz_id:
+        entry = crud.get_leaderboard_entry(session, job_id, resume_id, 0)
+        if entry is not None and entry.quiz_id:
+            metrics.incr("leaderboard.kept")
+            return
+    if quiz_id and not resume_id and crud.leaderboard_entry_with_quiz(session, job_id, quiz_id) is not None:
+        metrics.incr("leaderboard.kept")  # already ranked as part of that resume's entry
+        return
+    replaced, _ = crud.upsert_leaderboard_entry(session, job_id, resume_id, quiz_id, new, result.get("badge"))
+    metrics.incr("leaderboard.recorded")
+    with _lock:
+        b = _boards.get(job_id)
+        if b is None:
+            return  # built from the table, row included, on first read
+        for m in METRICS:
+            for old in replaced:  # the candidate's previous row, and a quiz-only row it absorbed
+                if old[m] is not None:
+                    b.trees[m].add(_bucket(old[m]), -1)
+            if new[m] is not None:
+                b.trees[m].add(_bucket(new[m]))
+
+
+def rank(session: Session, job_id: int, metric: str, score: float) -> Dict:
+    """1-based rank of `score` (ties share the best rank) and its percentile rank."""
+    t = _board(session, job_id).trees[metric]
+    i = _bucket(score)
+    with _lock:
+        total = t.total
+        below = t.prefix(i - 1)
+        upto = t.prefix(i)
+    above = total - upto
+    return {
+        "score": score,
+        "rank": above + 1,
+        "of": total,
+        # share of candidates below, counting ties as half
+        "percentile": round(100.0 * (below + 0.5 * (upto - below)) / total, 1) if total else None,
+    }
+
+
+def quantiles(session: Session, job_id: int, metric: str, qs=(0.25, 0.5, 0.75, 0.9)) -> Dict[str, Optional[float]]:
+    t = _board(session, job_id).trees[metric]
+    with _lock:
+        total = t.total
+        out = {}
+        for q in qs:
+            k = max(1, min(total, int(q * total + 0.999999)))
+            out[f"p{int(round(q * 100))}"] = t.kth(k) / RESOLUTION if total else None
+    return out
+
+
+def histogram(session: Session, job_id: int, metric: str, bins: int = 10) -> Dict:
+    """`bins` equal-width bins over 0-100; the last one includes 100."""
+    t = _board(session, job_id).trees[metric]
+    edges = [round(100.0 * j / bins, 1) for j in range(bins + 1)]
+    out: List[Dict] = []
+    with _lock:
+        prev = 0
+        for j in range(bins):
+            hi = _BUCKETS - 1 if j == bins - 1 else _bucket(edges[j + 1]) - 1
+            c = t.prefix(hi)
+            out.append({"lo": edges[j], "hi": edges[j + 1], "count": c - prev})
+            prev = c
+        total = t.total
+    return {"metric": metric, "count": total, "bins": out}
+
+
+def top(session: Session, job_id: int, metric: str, k: int = 10) -> List[Dict]:
+    col = crud.LEADERBOARD_COLUMNS[metric]
+    return [
+        {
+            "rank": n + 1,  # position in this list; rank() gives tie-aware ranks
+            "resume_id": r.resume_id or None,
+            "quiz_id": r.quiz_id or None,
+            "score": getattr(r, col),
+            "cv_score": r.cv_score,
+            "quiz_score": r.quiz_score,
+            "combined": r.combined,
+            "badge": r.badge,
+            "updated_at": r.updated_at,
+        }
+        for n, r in enumerate(crud.leaderboard_top(session, job_id, metric, k))
+    ]
@@ -0,0 +1,245 @@
+# app/services/llm_router.py
+"""
+Route chain calls over several Ollama endpoints.
+
+- Backends are grouped into pools (e.g. "light" for skill extraction, "heavy" for grading).
+- Each call goes to the healthy backend with the fewest outstanding requests,
+  never exceeding that backend's max_concurrency (callers wait for a free slot).
+- Connection errors mark the backend unhealthy and the call fails over to another one.
+- A daemon thread probes GET /api/tags periodically and brings backends back.
+"""
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import httpx
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_ollama import ChatOllama
+
+from app.core.metrics import metrics
+
+CONNECTION_ERRORS = (ConnectionError, httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class NoBackendAvailable(RuntimeError):
+    pass
+
+
+class Backend:
+    def __init__(
+        self,
+        url: str,
+        model: str,
+        pool: str = "default",
+        max_concurrency: int = 4,
+        temperature: float = 0.2,
+        timeout: Optional[float] = None,
+    ):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.pool = pool
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.temperature = temperature
+        self.outstanding = 0
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.last_probe: Optional[float] = None
+        self.served = 0
+        # timeout bounds each socket read, so a stalled model can't hold the call forever
+        self.llm = ChatOllama(model=model, base_url=self.url, temperature=temperature,
+                              client_kwargs={"timeout": timeout} if timeout else {})
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{self.url}"
+
+    def status(self) -> Dict:
+        return {
+            "name": self.name,
+            "pool": self.pool,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "served": self.served,
+            "last_error": self.last_error,
+            "last_probe": self.last_probe,
+        }
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        backends: List[Backend],
+        health_interval: float = 15.0,
+        retries: int = 2,
+        acquire_timeout: float = 30.0,
+    ):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.health_interval = health_interval
+        self.retries = retries
+        self.acquire_timeout = acquire_timeout
+        self._cond = threading.Condition()
+        self._probe_thread: Optional[threading.Thread] = None
+
+    # ---- selection ----
+    def _members(self, pool: str) -> List[Backend]:
+        members = [b for b in self.backends if b.pool == pool]
+        if not members and pool != "default":
+            members = [b for b in self.backends if b.pool == "default"]
+        return members or self.backends
+
+    def _acquire(self, pool: str, exclude: Set[Backend]) -> Backend:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                members = [b for b in self._members(pool) if b not in exclude]
+                if not members:
+                    raise NoBackendAvailable(f"no backend left to try in pool '{pool}'")
+                # if the whole pool looks down, still try it rather than fail outright
+                live = [b for b in members if b.healthy] or members
+                free = [b for b in live if b.outstanding < b.max_concurrency]
+                if free:
+                    b = min(free, key=lambda x: (x.outstanding, x.outstanding / x.max_concurrency))
+                    b.outstanding += 1
+                    return b
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise NoBackendAvailable(f"all backends in pool '{pool}' are at capacity")
+                self._cond.wait(remaining)
+
+    def _release(self, b: Backend, served: bool = False):
+        with self._cond:
+            b.outstanding -= 1
+            if served:
+                b.served += 1
+            self._cond.notify_all()
+
+    def _mark(self, b: Backend, healthy: bool, error: Optional[str] = None):
+        with self._cond:
+            b.healthy = healthy
+            b.last_error = error
+            self._cond.notify_all()
+
+    # ---- calls ----
+    def _acquire_timed(self, pool: str, tried: Set[Backend], last_exc: Optional[Exception]) -> Backend:
+        t0 = time.monotonic()
+        try:
+            return self._acquire(pool, tried)
+        except NoBackendAvailable:
+            if last_exc is not None:
+                raise last_exc
+            raise
+        finally:
+            metrics.observe(f"llm.queue_wait_s.{pool}", time.monotonic() - t0)
+
+    def invoke(self, pool: str, input: Any, config: Optional[RunnableConfig] = None, **kwargs):
+        tried: Set[Backend] = set()
+        last_exc: Optional[Exception] = None
+        for _ in range(self.retries + 1):
+            b = self._acquire_timed(pool, tried, last_exc)
+            t1 = time.monotonic()
+            served = False
+            try:
+                out = b.llm.invoke(input, config, **kwargs)
+                served = True
+                metrics.observe(f"llm.call_s.{pool}", time.monotonic() - t1)
+                return out
+            except CONNECTION_ERRORS as e:
+                self._mark(b, False, f"{type(e).__name__}: {e}")
+                tried.add(b)
+                last_exc = e
+            finally:
+                self._release(b, served)
+        raise last_exc
+
+    def stream(self, pool: str, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator:
+        """
+        Like invoke(), but yields message chunks. Failover only happens before the
+        first chunk. Closing the generator early closes the HTTP stream, which makes
+        Ollama stop generating, and frees the backend slot.
+        """
+        tried: Set[Backend] = set()
+        last_exc: Optional[Exception] = None
+        for _ in range(self.retries + 1):
+            b = self._acquire_timed(pool, tried, last_exc)
+            t1 = time.monotonic()
+            chunks = b.llm.stream(input, config, **kwargs)
+            started = served = False
+            try:
+                for chunk in chunks:
+                    started = True
+                    yield chunk
+                served = True
+                metrics.observe(f"llm.call_s.{pool}", time.monotonic() - t1)
+                return
+            except CONNECTION_ERRORS as e:
+                self._mark(b, False, f"{type(e).__name__}: {e}")
+                if started:
+                    raise
+                tried.add(b)
+                last_exc = e
+            finally:
+                chunks.close()
+                self._release(b, served)
+        raise last_exc
+
+    # ---- health ----
+    def probe(self, b: Backend) -> bool:
+        try:
+            r = httpx.get(f"{b.url}/api/tags", timeout=2.0)
+            r.raise_for_status()
+            names = {m.get("name") or m.get("model") for m in r.json().get("models", [])}
+            want = b.model if ":" in b.model else f"{b.model}:latest"
+            ok = want in names or b.model in names
+            self._mark(b, ok, None if ok else f"model {b.model} not available")
+        except Exception as e:
+            self._mark(b, False, f"{type(e).__name__}: {e}")
+        b.last_probe = time.time()
+        return b.healthy
+
+    def probe_all(self):
+        for b in self.backends:
+            self.probe(b)
+
+    def start_health_checks(self):
+        if self.health_interval <= 0 or self._probe_thread is not None:
+            return
+
+        def loop():
+            while True:
+                self.probe_all()
+                time.sleep(self.health_interval)
+
+        self._probe_thread = threading.Thread(target=loop, name="llm-health", daemon=True)
+        self._probe_thread.start()
+
+    def status(self) -> List[Dict]:
+        return [b.status() for b in self.backends]
+
+
+class RoutedChatModel(Runnable):
+    """Drop-in for ChatOllama in `prompt | llm` chains; each call is routed."""
+
+    def __init__(self, router: LLMRouter, pool: str = "default"):
+        self.router = router
+        self.pool = pool
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs):
+        return self.router.invoke(self.pool, input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator:
+        return self.router.stream(self.pool, input, config, **kwargs)
+
+
+def router_from_config(
+    backends: List[Dict], health_interval: float, retries: int, acquire_timeout: float,
+    read_timeout: Optional[float] = None,
+) -> LLMRouter:
+    return LLMRouter(
+        [Backend(**{"timeout": read_timeout, **cfg}) for cfg in backends],
+        health_interval=health_interval,
+        retries=retries,
+        acquire_timeout=acquire_timeout,
+    )
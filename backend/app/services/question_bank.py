@@ -0,0 +1,90 @@
+# app/services/question_bank.py
+"""
+Per-job bank of pre-generated quiz questions.
+
+The bank is filled in the background after JD ingest, so /quiz/start only
+has to sample from the DB. Questions are retired after
+settings.question_bank_max_serves quizzes, and the bank is topped up in the
+background when fewer than settings.question_bank_low_water remain. A fill
+that finds the job's JD replaced when it finishes discards its questions and
+generates them again from the new JD.
+"""
+import random
+import threading
+from typing import List, Optional
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db import crud
+from app.db.session import engine
+from app.services import resilience, scheduler
+from app.services.quiz import make_questions
+
+_filling: set = set()  # job_ids with a fill in flight
+_filling_lock = threading.Lock()
+
+
+def _servable(session: Session, job_id: int):
+    return [b for b in crud.list_bank(session, job_id) if b.times_served < settings.question_bank_max_serves]
+
+
+def needs_refill(session: Session, job_id: int) -> bool:
+    return len(_servable(session, job_id)) < settings.question_bank_low_water
+
+
+def fill_bank(job_id: int, target: Optional[int] = None) -> int:
+    """
+    Generate questions until the job has `target` servable ones.
+    Runs as a background task with its own session; returns how many were added.
+    """
+    with _filling_lock:
+        if job_id in _filling:
+            return 0
+        _filling.add(job_id)
+    try:
+        target = target or settings.question_bank_size
+        with Session(engine) as session:
+            for _ in range(3):
+                version = crud.get_jd_version(session, job_id)
+                need = target - len(_servable(session, job_id))
+                if need <= 0:
+                    return 0
+                with scheduler.priority("background"), resilience.track() as fallbacks:
+                    texts = make_questions(job_id, n=need, session=session, pad=False)
+                if fallbacks:
+                    print(f"⏳ question bank for job {job_id} not filled: LLM degraded ({', '.join(sorted(fallbacks))})")
+                    return 0
+                added = crud.add_bank_questions(session, job_id, texts, settings.question_bank_max_serves)
+                if crud.get_jd_version(session, job_id) == version:
+                    print(f"🏦 question bank for job {job_id}: +{len(added)}")
+                    return len(added)
+                # the JD was replaced mid-fill: drop questions from the old one and start over
+                # (the PUT's own refill was skipped while this one held the _filling guard)
+                crud.clear_bank(session, job_id)
+            return 0
+    except scheduler.Overloaded as e:
+        print(f"⏳ question bank for job {job_id} not filled: {e}")
+        return 0
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        return 0
+    finally:
+        with _filling_lock:
+            _filling.discard(job_id)
+
+
+def draw(session: Session, job_id: int, n: int) -> List[str]:
+    """
+    Sample n questions for one candidate. Less-served questions are preferred,
+    with randomness inside that window so candidates get different sets.
+    Returns [] if the bank cannot cover n yet (caller generates live).
+    """
+    avail = _servable(session, job_id)
+    if len(avail) < n:
+        return []
+    window = sorted(avail, key=lambda b: (b.times_served, random.random()))[: 2 * n]
+    picked = sorted(random.sample(window, n), key=lambda b: b.id)
+    crud.mark_bank_served(session, picked)
+    return [b.text for b in picked]
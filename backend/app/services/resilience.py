@@ -0,0 +1,159 @@
+# app/services/resilience.py
+"""
+Deadlines, circuit breakers and fallback tracking for the LLM chains.
+
+JsonChain (lc.py) gives each call a deadline (llm_deadlines, per chain) that
+starts once the scheduler admits it and also bounds the wait for each
+streamed chunk. The Ollama client's read timeout (llm_read_timeout) closes
+the connection to a model that has stopped sending. Each LLM pool has a
+breaker per priority class ("default.interactive", "default.background", ...),
+so failing background work can't degrade user-facing calls: after
+breaker_failure_threshold consecutive timeouts or errors it opens and calls
+fail at once with Degraded. After breaker_reset_s a single trial call is let
+through, which closes the breaker again on success.
+
+Callers catch Degraded and fall back to something deterministic (template
+questions, heuristic grades, keyword skills) and report it with
+note_fallback(). Routes wrap their work in track() to learn whether the
+response is degraded, which must then not be cached:
+
+    with resilience.track() as fallbacks:
+        summary = grade_many(...)
+    degraded = bool(fallbacks)
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+CHAINS = ["skills", "quiz", "grade"]
+
+for _c in CHAINS:
+    metrics.register_ratio(f"llm.fallback_rate.{_c}", f"llm.fallback.{_c}", f"llm.calls.{_c}")
+
+
+class Degraded(RuntimeError):
+    """The LLM result is unavailable; `reason` is timeout, error, breaker_open or skipped."""
+
+    def __init__(self, reason: str, message: str = ""):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def check(self):
+        if self.expired():
+            raise Degraded("timeout", f"LLM call exceeded its {self.seconds:g}s deadline")
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_s: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_s = reset_s
+        self.state = "closed"  # closed -> open -> half_open -> closed | open
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False    # a half-open trial call is in flight
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise Degraded unless a call may go to the backend now."""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_s:
+                    metrics.incr(f"llm.breaker.rejected.{self.name}")
+                    raise Degraded("breaker_open", f"LLM pool '{self.name}' is failing; breaker open")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial:
+                    metrics.incr(f"llm.breaker.rejected.{self.name}")
+                    raise Degraded("breaker_open", f"LLM pool '{self.name}' is being probed")
+                self._trial = True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+            if self.state != "closed":
+                self.state = "closed"
+                metrics.incr(f"llm.breaker.closed.{self.name}")
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                metrics.incr(f"llm.breaker.opened.{self.name}")
+
+    def cancel(self):
+        """The call never reached the backend (e.g. 429 from the scheduler)."""
+        with self._lock:
+            self._trial = False
+
+    def status(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = round(max(0.0, self.reset_s - (time.monotonic() - self.opened_at)), 1)
+            return {"state": self.state, "failures": self.failures, "retry_in_s": retry_in}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker for `name`, usually "<pool>.<priority class>"."""
+    with _breakers_lock:
+        b = _breakers.get(name)
+        if b is None:
+            b = _breakers[name] = CircuitBreaker(name, settings.breaker_failure_threshold, settings.breaker_reset_s)
+        return b
+
+
+def breaker_status() -> Dict[str, Dict]:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: b.status() for name, b in breakers.items()}
+
+
+# ---- per-request fallback tracking ----
+# one set per enclosing track() block, outermost first
+_fallbacks: contextvars.ContextVar[Tuple[Set[str], ...]] = contextvars.ContextVar("llm_fallbacks", default=())
+
+
+@contextmanager
+def track():
+    """Collect the fallbacks used inside the block; enclosing blocks see them too."""
+    mine: Set[str] = set()
+    token = _fallbacks.set(_fallbacks.get() + (mine,))
+    try:
+        yield mine
+    finally:
+        _fallbacks.reset(token)
+
+
+def note_fallback(chain: str, reason: str):
+    metrics.incr(f"llm.fallback.{chain}")
+    metrics.incr(f"llm.fallback_reason.{reason}")
+    for fallbacks in _fallbacks.get():
+        fallbacks.add(f"{chain}:{reason}")
+
+
+def request_degraded() -> bool:
+    # once one chain has fallen back, the rest of the request skips the LLM too
+    return any(_fallbacks.get())
@@ -0,0 +1,172 @@
+# app/services/scheduler.py
+"""
+Admission control and priority scheduling for LLM calls.
+
+Every JsonChain call (lc.py) takes a slot here before it reaches the router.
+Calls are classed by the request that triggered them:
+
+    interactive   /quiz/start            (someone is waiting on a blank quiz)
+    grade         /quiz/grade, /match
+    background    question-bank fills, skill extraction in batch jobs (the default)
+
+Up to `capacity` calls run at once (default: the summed max_concurrency of
+the LLM backends, so the router itself rarely queues). Each class also has a
+concurrency limit as a share of capacity: by default grading can't take the
+last slot from interactive calls and background work gets a quarter. When a
+slot frees up, the oldest waiter of the highest-priority class that is under
+its limit gets it.
+
+Each class has a bounded queue. A call that finds it full, or waits longer
+than the class's max wait, fails fast with Overloaded, which the API turns
+into 429 + Retry-After. Background work waits without a time limit by default.
+
+    with scheduler.priority("grade"):
+        grade_many(...)
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+CLASSES = ["interactive", "grade", "background"]  # highest priority first
+
+_class: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default="background")
+
+
+class Overloaded(RuntimeError):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def priority(cls: str):
+    """Run the enclosed LLM calls under priority class `cls`."""
+    if cls not in CLASSES:
+        raise ValueError(f"unknown priority class {cls!r}")
+    token = _class.set(cls)
+    try:
+        yield
+    finally:
+        _class.reset(token)
+
+
+def current_class() -> str:
+    return _class.get()
+
+
+class _Waiter:
+    __slots__ = ("cls", "event", "granted")
+
+    def __init__(self, cls: str):
+        self.cls = cls
+        self.event = threading.Event()
+        self.granted = False
+
+
+class Scheduler:
+    def __init__(self, capacity: int, shares: Dict[str, float], queue_depth: Dict[str, int],
+                 max_wait: Dict[str, float]):
+        self.capacity = max(1, capacity)
+        self.limits = {c: max(1, min(int(shares.get(c, 1.0) * self.capacity), self.capacity)) for c in CLASSES}
+        self.queue_depth = {c: int(queue_depth.get(c, 64)) for c in CLASSES}
+        self.max_wait = {c: float(max_wait.get(c, 0.0)) for c in CLASSES}
+        self._lock = threading.Lock()
+        self._queues: Dict[str, List[_Waiter]] = {c: [] for c in CLASSES}
+        self._running: Dict[str, int] = {c: 0 for c in CLASSES}
+        self._avg_service = 2.0  # EWMA of slot hold time (s), for Retry-After
+
+    # ---- internals (call with _lock held) ----
+    def _total_running(self) -> int:
+        return sum(self._running.values())
+
+    def _dispatch(self):
+        while self._total_running() < self.capacity:
+            for c in CLASSES:
+                if self._queues[c] and self._running[c] < self.limits[c]:
+                    w = self._queues[c].pop(0)
+                    w.granted = True
+                    self._running[c] += 1
+                    w.event.set()
+                    break
+            else:
+                return
+
+    def _retry_after(self, cls: str) -> int:
+        ahead = sum(len(self._queues[c]) for c in CLASSES[: CLASSES.index(cls) + 1])
+        return max(1, math.ceil(self._avg_service * (ahead + 1) / self.limits[cls]))
+
+    # ---- public ----
+    def acquire(self, cls: str):
+        t0 = time.monotonic()
+        w = _Waiter(cls)
+        with self._lock:
+            if len(self._queues[cls]) >= self.queue_depth[cls]:
+                metrics.incr(f"scheduler.rejected.{cls}")
+                raise Overloaded(f"LLM queue for '{cls}' is full", self._retry_after(cls))
+            self._queues[cls].append(w)
+            self._dispatch()
+        timeout = self.max_wait[cls] or None
+        if not w.event.wait(timeout):
+            with self._lock:
+                if not w.granted:  # may have been granted between the timeout and the lock
+                    self._queues[cls].remove(w)
+                    metrics.incr(f"scheduler.timed_out.{cls}")
+                    raise Overloaded(f"LLM queue wait for '{cls}' exceeded {self.max_wait[cls]:.0f}s",
+                                     self._retry_after(cls))
+        metrics.observe(f"scheduler.queue_wait_s.{cls}", time.monotonic() - t0)
+        metrics.incr(f"scheduler.admitted.{cls}")
+
+    def release(self, cls: str, held_s: float):
+        with self._lock:
+            self._running[cls] -= 1
+            self._avg_service = 0.8 * self._avg_service + 0.2 * held_s
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, cls: Optional[str] = None):
+        cls = cls or current_class()
+        self.acquire(cls)
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(cls, time.monotonic() - t0)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "avg_service_s": round(self._avg_service, 3),
+                "classes": {
+                    c: {
+                        "running": self._running[c],
+                        "queued": len(self._queues[c]),
+                        "limit": self.limits[c],
+                        "queue_depth": self.queue_depth[c],
+                        "max_wait_s": self.max_wait[c],
+                    }
+                    for c in CLASSES
+                },
+            }
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            capacity = settings.scheduler_capacity or sum(
+                int(b.get("max_concurrency", 4)) for b in settings.llm_backends
+            )
+            _scheduler = Scheduler(capacity, settings.scheduler_concurrency,
+                                   settings.scheduler_queue_depth, settings.scheduler_max_wait)
+        return _scheduler
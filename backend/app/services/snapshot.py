@@ -0,0 +1,234 @@
+# app/services/snapshot.py
+"""
+Portable job snapshots for warming up a new replica.
+
+A bundle holds one or more jobs, each with its JD, cached skills, question
+bank, and the indexed chunk texts together with their embedding vectors.
+Importing writes the vectors straight into the configured store (NumPy shard
+or Chroma collection), so no chunk is embedded again and no LLM is called.
+
+Layout (little-endian), written and read as a stream:
+
+    MAGIC
+    per job:  uint32 meta_len, uint32 vec_len,
+              zlib(JSON meta) [meta_len], raw vectors [vec_len]
+    end:      uint32 0, uint32 0
+
+meta is {"version", "job", "skills", "bank", "chunk_ids", "chunk_texts",
+"embedding_model", "dim", "dtype", "crc32"}; the vectors are a C-order
+[n_chunks, dim] matrix of `dtype` (float32, or float16 for half the size).
+
+Job ids are kept, so links like /quiz/start?job_id=... work on every replica.
+An existing job with a different JD is left alone unless overwrite=True.
+
+    with open("jobs.snap", "wb") as f:
+        snapshot.export_jobs(session, [1, 2, 3], f)
+"""
+import json
+import struct
+import zlib
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db import crud
+from app.services import context, leaderboard
+from app.services.lc import export_job_vectors, import_job_vectors, job_vector_ids
+
+MAGIC = b"HSNAP\x00\x01\n"
+VERSION = 1
+DTYPES = ("float32", "float16")
+_REC = struct.Struct("<II")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+# ---------------- export ----------------
+
+def _pack_job(session: Session, job_id: int, dtype: str) -> Tuple[bytes, bytes]:
+    job = crud.get_job(session, job_id)
+    if job is None:
+        raise SnapshotError(f"job {job_id} not found")
+    vec = export_job_vectors(job_id)
+    mat = vec["embeddings"]
+    meta = {
+        "version": VERSION,
+        "job": {
+            "id": job.id,
+            "title": job.title,
+            "jd_text": job.jd_text,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+        },
+        "skills": crud.get_job_skills(session, job_id),
+        "bank": [b.text for b in crud.list_bank(session, job_id)],
+        "chunk_ids": vec["ids"],
+        "chunk_texts": vec["documents"],
+        "embedding_model": settings.embedding_model,
+        "dim": int(mat.shape[1]) if mat.ndim == 2 and mat.size else 0,
+        "dtype": dtype,
+    }
+    raw = np.ascontiguousarray(mat, dtype=dtype).tobytes() if mat.size else b""
+    meta["crc32"] = zlib.crc32(raw)
+    return zlib.compress(json.dumps(meta).encode("utf-8"), 6), raw
+
+
+def export_jobs(session: Session, job_ids: List[int], fh: BinaryIO, dtype: str = "float32") -> List[Dict]:
+    """Write a bundle of `job_ids` to `fh`; returns one summary dict per job."""
+    if dtype not in DTYPES:
+        raise SnapshotError(f"dtype must be one of {DTYPES}")
+    fh.write(MAGIC)
+    out = []
+    for job_id in job_ids:
+        meta, raw = _pack_job(session, job_id, dtype)
+        fh.write(_REC.pack(len(meta), len(raw)))
+        fh.write(meta)
+        fh.write(raw)
+        out.append({"job_id": job_id, "bytes": _REC.size + len(meta) + len(raw)})
+    fh.write(_REC.pack(0, 0))
+    return out
+
+
+# ---------------- import ----------------
+
+def _read_exact(fh: BinaryIO, n: int) -> bytes:
+    buf = fh.read(n)
+    if len(buf) != n:
+        raise SnapshotError("snapshot is truncated")
+    return buf
+
+
+_META_TYPES = {
+    "job": dict, "chunk_ids": list, "chunk_texts": list, "embedding_model": str,
+    "dim": int, "dtype": str, "crc32": int,
+}
+_JOB_TYPES = {"id": int, "title": str, "jd_text": str}
+
+
+def _check_meta(meta) -> Dict:
+    """Reject headers with missing or mistyped fields before anything reads them."""
+    if not isinstance(meta, dict):
+        raise SnapshotError("corrupt snapshot header: not an object")
+    if meta.get("version") != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {meta.get('version')}")
+    for fields, obj, where in ((_META_TYPES, meta, "header"), (_JOB_TYPES, meta.get("job"), "job")):
+        for key, typ in fields.items():
+            v = obj.get(key)
+            if not isinstance(v, typ) or (typ is int and isinstance(v, bool)):
+                raise SnapshotError(f"corrupt snapshot {where}: {key!r} missing or not {typ.__name__}")
+    job_id = meta["job"]["id"]
+    chunks_ok = all(isinstance(x, str) for x in meta["chunk_ids"] + meta["chunk_texts"])
+    if not chunks_ok or len(meta["chunk_texts"]) != len(meta["chunk_ids"]) or meta["dim"] < 0:
+        raise SnapshotError(f"corrupt snapshot header for job {job_id}: bad chunk lists")
+    try:
+        created = meta["job"].get("created_at")
+        if created is not None:
+            datetime.fromisoformat(created)
+    except (TypeError, ValueError):
+        raise SnapshotError(f"corrupt snapshot header for job {job_id}: bad created_at")
+    if meta["dtype"] not in DTYPES:
+        raise SnapshotError(f"unsupported vector dtype {meta['dtype']!r}")
+    bank = meta.get("bank", [])
+    if (not isinstance(meta.get("skills"), (list, type(None)))
+            or not isinstance(bank, list) or not all(isinstance(b, str) for b in bank)):
+        raise SnapshotError(f"corrupt snapshot header for job {job_id}: bad skills or bank")
+    return meta
+
+
+def read_bundle(fh: BinaryIO) -> Iterator[Tuple[Dict, np.ndarray]]:
+    """Yield (meta, float32 vectors [n, dim]) per job, one job in memory at a time."""
+    if fh.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("not a job snapshot (bad magic)")
+    while True:
+        meta_len, vec_len = _REC.unpack(_read_exact(fh, _REC.size))
+        if meta_len == 0:
+            return
+        packed = _read_exact(fh, meta_len)
+        raw = _read_exact(fh, vec_len)
+        try:
+            meta = json.loads(zlib.decompress(packed))
+        except (zlib.error, ValueError) as e:
+            raise SnapshotError(f"corrupt snapshot header: {e}")
+        _check_meta(meta)
+        if zlib.crc32(raw) != meta["crc32"]:
+            raise SnapshotError(f"vectors of job {meta['job']['id']} fail the checksum")
+        n, dim = len(meta["chunk_ids"]), meta["dim"]
+        if len(raw) != n * dim * np.dtype(meta["dtype"]).itemsize:
+            raise SnapshotError(f"vectors of job {meta['job']['id']} don't match {n} x {dim} {meta['dtype']}")
+        mat = np.frombuffer(raw, dtype=meta["dtype"]).reshape(n, dim).astype(np.float32)
+        yield meta, mat
+
+
+def _unchanged(session: Session, meta: Dict) -> bool:
+    """
+    True when the job already holds this snapshot: same chunk ids (content
+    hashes, embedded with the same model), skills and bank questions.
+    """
+    job_id = meta["job"]["id"]
+    if set(job_vector_ids(job_id)) != set(meta["chunk_ids"]):
+        return False
+    skills = meta.get("skills")
+    if skills is not None and skills != crud.get_job_skills(session, job_id):
+        return False
+    have = {b.text for b in crud.list_bank(session, job_id)}
+    return all(t in have for t in meta.get("bank") or [])
+
+
+def _restore_job(session: Session, meta: Dict, mat: np.ndarray, overwrite: bool) -> Dict:
+    j = meta["job"]
+    job_id = j["id"]
+    out: Dict = {"job_id": job_id}
+    if meta["embedding_model"] != settings.embedding_model:
+        return {**out, "status": "skipped",
+                "reason": f"vectors are from {meta['embedding_model']}, this node uses {settings.embedding_model}"}
+
+    job = crud.get_job(session, job_id)
+    if job is None:
+        out["status"] = "created"
+    elif job.jd_text != j["jd_text"]:
+        if not overwrite:
+            return {**out, "status": "skipped", "reason": "job exists with a different JD (use overwrite)"}
+        out["status"] = "overwritten"
+    elif job.title == j["title"] and _unchanged(session, meta):
+        # importing the same bundle again rewrites nothing
+        return {**out, "status": "unchanged", "chunks": len(meta["chunk_ids"]), "removed": 0,
+                "skills": len(meta.get("skills") or []), "bank_added": 0}
+    else:
+        out["status"] = "updated"
+
+    # vectors first: if they can't be written, the job's DB rows are left as they were
+    out.update(import_job_vectors(job_id, meta["chunk_ids"], meta["chunk_texts"], mat))
+    jd_changed = out["status"] == "overwritten"
+    if job is None:
+        created = datetime.fromisoformat(j["created_at"]) if j.get("created_at") else None
+        try:
+            crud.restore_job(session, job_id, j["title"], j["jd_text"], created)
+        except Exception:
+            session.rollback()
+            import_job_vectors(job_id, [], [], mat[:0])  # don't leave an index without a job
+            raise
+    elif jd_changed:
+        crud.update_job(session, job_id, j["title"], j["jd_text"])
+
+    skills: Optional[List[Dict]] = meta.get("skills")
+    if skills is not None and skills != crud.get_job_skills(session, job_id):
+        crud.set_job_skills(session, job_id, skills)  # bumps skills_version only when it changed
+    elif jd_changed:
+        crud.set_job_skills(session, job_id, None)
+    out["skills"] = len(skills or [])
+
+    if jd_changed:
+        crud.clear_bank(session, job_id)
+        leaderboard.clear_job(session, job_id)
+    out["bank_added"] = len(crud.add_bank_questions(session, job_id, meta.get("bank") or []))
+    context.clear_job(job_id)
+    return out
+
+
+def import_bundle(session: Session, fh: BinaryIO, overwrite: bool = False) -> List[Dict]:
+    """Load every job in the bundle; returns one summary dict per job."""
+    return [_restore_job(session, meta, mat, overwrite) for meta, mat in read_bundle(fh)]
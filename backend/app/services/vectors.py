@@ -0,0 +1,177 @@
+# app/services/vectors.py
+"""
+In-process vector store for per-job JD chunks.
+
+A JD only produces a few dozen chunks, so exact cosine search over a small
+float32 matrix beats going through Chroma's client/SQLite/HNSW stack.
+Each job is one shard on disk:
+  {root}/job_{id}.npy   float32 [n_chunks, dim], L2-normalized, memory-mapped on read
+  {root}/job_{id}.json  {"ids": [...], "texts": [...]} in the same row order
+The public surface mirrors the bits of langchain_chroma.Chroma we use
+(add_texts / delete / get / similarity_search / as_retriever).
+"""
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# path -> (json mtime_ns, ids, texts, matrix); evicted whenever a shard is rewritten
+_CACHE: Dict[str, Tuple[int, List[str], List[str], np.ndarray]] = {}
+_LOCK = threading.Lock()
+# path -> lock held by writers from their _load() through _write(), so concurrent
+# read-modify-writes of one shard (e.g. a reindex during a snapshot import) don't drop rows
+_WRITE_LOCKS: Dict[str, threading.Lock] = {}
+
+
+def _write_lock(path: str) -> threading.Lock:
+    with _LOCK:
+        return _WRITE_LOCKS.setdefault(path, threading.Lock())
+
+
+def shard_paths(root: str, job_id: int) -> Tuple[str, str]:
+    base = os.path.join(root, f"job_{job_id}")
+    return base + ".npy", base + ".json"
+
+
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    # rows that are already unit length (snapshot imports) are kept bit-for-bit
+    norms[(norms == 0) | (np.abs(norms - 1.0) < 1e-6)] = 1.0
+    return mat / norms
+
+
+class NumpyVectorStore:
+    def __init__(self, job_id: int, embedding_function, root: str):
+        self.job_id = job_id
+        self.embedding_function = embedding_function
+        self.root = root
+        self.vec_path, self.meta_path = shard_paths(root, job_id)
+
+    # ---- storage ----
+    def _load(self) -> Tuple[List[str], List[str], Optional[np.ndarray]]:
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return [], [], None
+
+        with _LOCK:
+            hit = _CACHE.get(self.meta_path)
+            if hit and hit[0] == mtime:
+                return hit[1], hit[2], hit[3]
+
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            ids, texts = meta.get("ids", []), meta.get("texts", [])
+            mat = np.load(self.vec_path, mmap_mode="r") if ids else None
+            if mat is not None and mat.shape[0] != len(ids):
+                raise RuntimeError(f"vector shard {self.vec_path} is out of sync with {self.meta_path}")
+            _CACHE[self.meta_path] = (mtime, ids, texts, mat)
+            return ids, texts, mat
+
+    def _write(self, ids: List[str], texts: List[str], mat: Optional[np.ndarray]):
+        os.makedirs(self.root, exist_ok=True)
+        with _LOCK:
+            # drop our mmap first so the file can be replaced (Windows keeps mapped files locked)
+            _CACHE.pop(self.meta_path, None)
+            if ids:
+                tmp = self.vec_path + ".tmp.npy"
+                np.save(tmp, np.ascontiguousarray(mat, dtype=np.float32))
+                os.replace(tmp, self.vec_path)
+            elif os.path.exists(self.vec_path):
+                os.remove(self.vec_path)
+            tmp = self.meta_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"ids": ids, "texts": texts}, f)
+            os.replace(tmp, self.meta_path)
+
+    # ---- Chroma-like API ----
+    def add_embeddings(
+        self, texts: List[str], embeddings, ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """Upsert rows with precomputed vectors (same ids replace existing rows)."""
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        new = _normalize_rows(embeddings)
+
+        with _write_lock(self.meta_path):
+            old_ids, old_texts, old_mat = self._load()
+            replaced = set(ids)
+            keep = [i for i, x in enumerate(old_ids) if x not in replaced]
+            all_ids = [old_ids[i] for i in keep] + ids
+            all_texts = [old_texts[i] for i in keep] + texts
+            if old_mat is not None and keep:
+                mat = np.vstack([np.asarray(old_mat[keep]), new])
+            else:
+                mat = new
+            self._write(all_ids, all_texts, mat)
+        return ids
+
+    def add_texts(
+        self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vecs = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(texts, vecs, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs) -> None:
+        drop = set(ids or [])
+        with _write_lock(self.meta_path):
+            old_ids, old_texts, old_mat = self._load()
+            keep = [i for i, x in enumerate(old_ids) if x not in drop]
+            if len(keep) == len(old_ids):
+                return
+            mat = np.asarray(old_mat[keep]) if keep else None
+            self._write([old_ids[i] for i in keep], [old_texts[i] for i in keep], mat)
+
+    def get(self, include: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+        ids, texts, mat = self._load()
+        out: Dict[str, Any] = {"ids": list(ids), "documents": list(texts), "metadatas": [None] * len(ids)}
+        if include and "embeddings" in include:
+            out["embeddings"] = np.asarray(mat) if mat is not None else np.zeros((0, 0), dtype=np.float32)
+        return out
+
+    def similarity_search_by_vector(self, embedding, k: int = 4) -> List[Document]:
+        ids, texts, mat = self._load()
+        if mat is None or not ids:
+            return []
+        q = _normalize_rows(embedding)[0]
+        scores = mat @ q
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            Document(page_content=texts[i], metadata={"id": ids[i], "score": float(scores[i])})
+            for i in top
+        ]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        if not self._load()[0]:
+            return []
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k=k)
+
+    def as_retriever(self, search_type: str = "similarity", search_kwargs: Optional[dict] = None, **kwargs):
+        k = int((search_kwargs or {}).get("k", 4))
+        return NumpyRetriever(store=self, k=k)
+
+
+class NumpyRetriever(BaseRetriever):
+    store: Any
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.store.similarity_search(query, k=self.k)
@@ -0,0 +1,131 @@
+"""
+Benchmark JD retrieval: Chroma vs the in-process NumPy store.
+
+Each backend runs in its own subprocess so peak RSS is comparable.
+By default a deterministic fake embedder is used, so the numbers measure
+store overhead only (pass --real-embeddings to include MiniLM).
+
+    cd backend
+    python scripts/bench_vectorstore.py --jobs 50 --chunks 30 --queries 300
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "python react kubernetes docker aws terraform postgres redis kafka spark airflow "
+    "ci/cd testing microservices graphql typescript node.js linux agile ownership mentoring "
+    "design scalable reliable pipelines monitoring security cloud data apis performance"
+).split()
+
+QUERIES = [
+    "key skills, requirements, and tech stack",
+    "key skills, hard requirements, preferred qualifications, and tech stack",
+    "job requirements and skills relevant to: Have you worked with Kubernetes?",
+]
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024.0 / (1024.0 if sys.platform == "darwin" else 1.0)
+    except ImportError:
+        return float("nan")
+
+
+def _fake_chunks(rng: random.Random, n: int):
+    return [" ".join(rng.choice(WORDS) for _ in range(120)) for _ in range(n)]
+
+
+def _embedder(real: bool):
+    if real:
+        from app.services.lc import get_embedder
+        return get_embedder()
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    return DeterministicFakeEmbedding(size=384)
+
+
+def _open_store(backend: str, job_id: int, root: str, emb):
+    if backend == "numpy":
+        from app.services.vectors import NumpyVectorStore
+        return NumpyVectorStore(job_id, emb, root)
+    from langchain_chroma import Chroma
+    return Chroma(
+        collection_name=f"jd_{job_id}",
+        embedding_function=emb,
+        persist_directory=os.path.join(root, f"job_{job_id}"),
+    )
+
+
+def run_one(args) -> dict:
+    rng = random.Random(args.seed)
+    emb = _embedder(args.real_embeddings)
+    root = tempfile.mkdtemp(prefix=f"bench_{args.backend}_")
+
+    t0 = time.perf_counter()
+    for job_id in range(1, args.jobs + 1):
+        _open_store(args.backend, job_id, root, emb).add_texts(_fake_chunks(rng, args.chunks))
+    index_s = time.perf_counter() - t0
+
+    # mirror get_retriever(): open the store per request, then query it
+    lat = []
+    for i in range(args.queries):
+        job_id = rng.randint(1, args.jobs)
+        q = QUERIES[i % len(QUERIES)]
+        t = time.perf_counter()
+        docs = _open_store(args.backend, job_id, root, emb).as_retriever(search_kwargs={"k": 6}).invoke(q)
+        lat.append((time.perf_counter() - t) * 1000.0)
+        assert docs, "empty retrieval"
+
+    lat.sort()
+    pick = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))]
+    return {
+        "backend": args.backend,
+        "index_s": round(index_s, 3),
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backend", choices=["chroma", "numpy"], help="run a single backend in-process")
+    ap.add_argument("--jobs", type=int, default=50)
+    ap.add_argument("--chunks", type=int, default=30, help="chunks per job")
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--real-embeddings", action="store_true")
+    args = ap.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_one(args)))
+        return
+
+    rows = []
+    for backend in ("chroma", "numpy"):
+        cmd = [sys.executable, os.path.abspath(__file__), "--backend", backend,
+               "--jobs", str(args.jobs), "--chunks", str(args.chunks),
+               "--queries", str(args.queries), "--seed", str(args.seed)]
+        if args.real_embeddings:
+            cmd.append("--real-embeddings")
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        rows.append(json.loads(out.strip().splitlines()[-1]))
+
+    cols = ["backend", "index_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"]
+    print(" | ".join(f"{c:>11}" for c in cols))
+    for r in rows:
+        print(" | ".join(f"{r[c]!s:>11}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()
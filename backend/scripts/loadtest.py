@@ -0,0 +1,382 @@
+"""
+HTTP load test for the frontend flow, with an SLO report per concurrency stage.
+
+Each virtual user loops over what the UI does (frontend/src/api.ts):
+    POST /ingest/resume-file -> POST /quiz/start -> POST /quiz/grade -> POST /match
+against a few JDs ingested once up front. Users are closed-loop (next flow
+starts when the previous one finishes), and concurrency is ramped stage by
+stage to find the knee: where throughput stops growing and latency climbs.
+
+By default the app is spawned with uvicorn against an in-process stub Ollama
+(scripts/stub_ollama.py), hash embeddings and the NumPy vector store, so the
+numbers measure our own stack with a fixed, configurable model latency:
+
+    cd backend
+    python scripts/loadtest.py --ramp 5,10,25,50 --duration 20 --stub-latency 0.4
+    python scripts/loadtest.py --base-url http://localhost:8000 --ramp 2,4,8   # existing server
+
+Server-side queueing comes from GET /metrics (llm.queue_wait_s.* timers, diffed per stage).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    raise SystemExit("loadtest needs httpx: pip install httpx")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+ROUTES = ["resume-file", "quiz/start", "quiz/grade", "match"]
+
+JD_TEMPLATE = """{title}
+
+About us
+We are a fast-growing company with great benefits, health insurance and paid time off.
+
+Requirements
+- {years}+ years of experience with Python and FastAPI
+- Strong knowledge of PostgreSQL and Redis
+- Hands-on experience with Docker and Kubernetes on AWS
+- Familiarity with CI/CD pipelines and {extra}
+
+Nice to have
+- Experience with Kafka, Terraform or GraphQL
+"""
+
+RESUME_SKILLS = "Python FastAPI Django PostgreSQL Redis Docker Kubernetes AWS Terraform Kafka React GraphQL CI/CD Linux".split()
+
+ANSWERS = [
+    "Yes, {y} years of Python and FastAPI in production, deployed on AWS with Docker.",
+    "No",
+    "Some exposure in side projects, not at work.",
+    "I led the migration to Kubernetes and wrote our Helm charts and CI/CD pipelines.",
+    "",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _resume(rng: random.Random) -> bytes:
+    skills = rng.sample(RESUME_SKILLS, rng.randint(3, 9))
+    lines = ["Jane Doe - Backend Engineer", "", "Skills: " + ", ".join(skills), "", "Experience"]
+    for i in range(rng.randint(2, 5)):
+        lines.append(f"- Built services with {rng.choice(skills)} and {rng.choice(skills)} ({rng.randint(1, 6)} years)")
+    return "\n".join(lines).encode("utf-8")
+
+
+def _pct(values: List[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    s = sorted(values)
+    k = min(len(s) - 1, max(0, int(round(p / 100.0 * (len(s) - 1)))))
+    return s[k]
+
+
+# ---------------- app under test ----------------
+
+class SpawnedApp:
+    """Stub Ollama in this process + uvicorn in a subprocess, with a throwaway DB and vector dir."""
+
+    def __init__(self, args):
+        import stub_ollama
+
+        self.tmp = tempfile.mkdtemp(prefix="loadtest_")
+        stub_port = args.stub_port or _free_port()
+        self.stub = stub_ollama.serve(stub_port, ["mistral:latest"], args.stub_latency, args.stub_jitter,
+                                      args.stub_fail_rate, args.stub_token_delay)
+        self.port = args.port or _free_port()
+        env = dict(os.environ)
+        env.update({
+            "DB_URL": f"sqlite:///{os.path.join(self.tmp, 'app.db')}",
+            "DB_ECHO": "false",
+            "VECTOR_BACKEND": args.vector_backend,
+            "VECTOR_ROOT": os.path.join(self.tmp, "vectors"),
+            "EMBEDDING_MODEL": env.get("EMBEDDING_MODEL", "fake:384") if not args.real_embeddings
+            else "sentence-transformers/all-MiniLM-L6-v2",
+            "LLM_BACKENDS": json.dumps([{"url": f"http://127.0.0.1:{stub_port}", "model": "mistral:latest",
+                                         "max_concurrency": args.stub_concurrency}]),
+        })
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+               "--port", str(self.port), "--workers", str(args.workers), "--log-level", "warning"]
+        self.log = open(os.path.join(self.tmp, "uvicorn.log"), "w")
+        self.proc = subprocess.Popen(cmd, cwd=BACKEND, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.base_url = f"http://127.0.0.1:{self.port}"
+
+    def wait_ready(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                break
+            try:
+                if httpx.get(f"{self.base_url}/health", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise SystemExit(f"app did not start; see {self.log.name}")
+
+    def stop(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.stub.shutdown()
+        self.log.close()
+
+
+# ---------------- load ----------------
+
+class Stage:
+    def __init__(self, users: int):
+        self.users = users
+        self.lat: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.flows = 0
+        self.flow_lat: List[float] = []
+        self.elapsed = 0.0
+        self.server: Dict[str, Dict] = {}
+
+    def record(self, route: str, dt: float, status: Optional[int]):
+        self.lat[route].append(dt)
+        self.status[route][status or 0] += 1
+        if status is None or status >= 400:
+            self.errors[route] += 1
+
+
+async def _call(client, stage: Stage, route: str, method: str, url: str, **kw):
+    t0 = time.perf_counter()
+    try:
+        r = await client.request(method, url, **kw)
+    except httpx.HTTPError:
+        stage.record(route, time.perf_counter() - t0, None)
+        return None
+    stage.record(route, time.perf_counter() - t0, r.status_code)
+    return r.json() if r.status_code < 400 else None
+
+
+async def _flow(client, stage: Stage, rng: random.Random, job_ids: List[int], n_questions: int) -> bool:
+    job_id = rng.choice(job_ids)
+    files = {"file": ("resume.txt", _resume(rng), "text/plain")}
+    res = await _call(client, stage, "resume-file", "POST", "/ingest/resume-file", files=files)
+    if not res:
+        return False
+    quiz = await _call(client, stage, "quiz/start", "POST", "/quiz/start", json={"job_id": job_id, "n": n_questions})
+    if not quiz:
+        return False
+    answers = [
+        {"question_id": q["id"], "text": rng.choice(ANSWERS).format(y=rng.randint(1, 8))}
+        for q in quiz.get("questions", [])
+    ]
+    graded = await _call(client, stage, "quiz/grade", "POST", "/quiz/grade",
+                         json={"quiz_id": quiz["quiz_id"], "answers": answers})
+    if graded is None:
+        return False
+    match = await _call(client, stage, "match", "POST", "/match",
+                        json={"job_id": job_id, "resume_id": res["resume_id"], "quiz_id": quiz["quiz_id"]})
+    return match is not None
+
+
+async def _user(client, stage: Stage, seed: int, job_ids, n_questions: int, stop_at: float):
+    rng = random.Random(seed)
+    while time.monotonic() < stop_at:
+        t0 = time.perf_counter()
+        if await _flow(client, stage, rng, job_ids, n_questions):
+            stage.flows += 1
+            stage.flow_lat.append(time.perf_counter() - t0)
+
+
+async def _server_metrics(client) -> Dict:
+    try:
+        r = await client.get("/metrics")
+        return r.json().get("timers", {}) if r.status_code == 200 else {}
+    except httpx.HTTPError:
+        return {}
+
+
+def _timer_diff(before: Dict, after: Dict) -> Dict[str, Dict]:
+    out = {}
+    for name, t in after.items():
+        if "queue" not in name and "wait" not in name:
+            continue
+        b = before.get(name, {"count": 0, "total": 0.0})
+        count = t["count"] - b["count"]
+        if count > 0:
+            # max is process-lifetime, not per stage; only count/avg are diffed
+            out[name] = {"count": count, "avg": (t["total"] - b["total"]) / count}
+    return out
+
+
+async def run_stage(base_url: str, users: int, duration: float, job_ids, n_questions: int, timeout: float) -> Stage:
+    stage = Stage(users)
+    limits = httpx.Limits(max_connections=users + 2, max_keepalive_connections=users + 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        before = await _server_metrics(client)
+        t0 = time.monotonic()
+        stop_at = t0 + duration
+        await asyncio.gather(*[
+            _user(client, stage, seed=users * 1000 + i, job_ids=job_ids, n_questions=n_questions, stop_at=stop_at)
+            for i in range(users)
+        ])
+        stage.elapsed = time.monotonic() - t0
+        stage.server = _timer_diff(before, await _server_metrics(client))
+    return stage
+
+
+def setup_jobs(base_url: str, n: int, timeout: float) -> List[int]:
+    ids = []
+    with httpx.Client(base_url=base_url, timeout=timeout) as c:
+        for i in range(n):
+            jd = JD_TEMPLATE.format(title=f"Backend Engineer {i}", years=2 + i % 4,
+                                    extra=["Kafka", "Terraform", "GraphQL", "React"][i % 4])
+            r = c.post("/ingest/jd", json={"title": f"Backend Engineer {i}", "jd_text": jd})
+            r.raise_for_status()
+            ids.append(r.json()["job_id"])
+    return ids
+
+
+# ---------------- report ----------------
+
+def summarize(stage: Stage, slo_p95_ms: float, slo_error_rate: float) -> Dict:
+    routes = {}
+    slo_ok = True
+    for route in ROUTES:
+        lat = stage.lat.get(route, [])
+        n = len(lat)
+        err = stage.errors.get(route, 0)
+        p95 = _pct(lat, 95) * 1000
+        err_rate = err / n if n else 0.0
+        ok = n > 0 and p95 <= slo_p95_ms and err_rate <= slo_error_rate
+        slo_ok &= ok
+        routes[route] = {
+            "requests": n,
+            "rps": n / stage.elapsed if stage.elapsed else 0.0,
+            "p50_ms": _pct(lat, 50) * 1000,
+            "p95_ms": p95,
+            "p99_ms": _pct(lat, 99) * 1000,
+            "error_rate": err_rate,
+            "status": {str(k): v for k, v in sorted(stage.status[route].items())},
+            "slo_ok": ok,
+        }
+    return {
+        "users": stage.users,
+        "elapsed_s": stage.elapsed,
+        "flows": stage.flows,
+        "flows_per_s": stage.flows / stage.elapsed if stage.elapsed else 0.0,
+        "flow_p95_ms": _pct(stage.flow_lat, 95) * 1000,
+        "routes": routes,
+        "server_queue": stage.server,
+        "slo_ok": slo_ok,
+    }
+
+
+def find_knee(stages: List[Dict], min_gain: float = 0.10, latency_growth: float = 1.5) -> Optional[int]:
+    """First stage where throughput grew < min_gain while flow p95 grew > latency_growth."""
+    for prev, cur in zip(stages, stages[1:]):
+        if not prev["flows_per_s"]:
+            continue
+        gain = cur["flows_per_s"] / prev["flows_per_s"] - 1.0
+        grow = cur["flow_p95_ms"] / prev["flow_p95_ms"] if prev["flow_p95_ms"] else 1.0
+        if gain < min_gain and grow > latency_growth:
+            return prev["users"]
+    return None
+
+
+def print_stage(s: Dict):
+    print(f"\n== {s['users']} users: {s['flows']} flows in {s['elapsed_s']:.1f}s "
+          f"({s['flows_per_s']:.2f} flows/s, flow p95 {s['flow_p95_ms']:.0f} ms) "
+          f"SLO {'PASS' if s['slo_ok'] else 'FAIL'}")
+    print(f"{'route':<14}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err %':>8}  status")
+    for route, r in s["routes"].items():
+        print(f"{route:<14}{r['requests']:>7}{r['rps']:>8.2f}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+              f"{r['p99_ms']:>9.0f}{100 * r['error_rate']:>7.1f}%  {r['status']}")
+    for name, t in sorted(s["server_queue"].items()):
+        print(f"  server {name}: {t['count']} waits, avg {1000 * t['avg']:.0f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", help="target an already running app instead of spawning one")
+    ap.add_argument("--ramp", default="1,5,10,25,50", help="comma-separated concurrent users per stage")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per stage")
+    ap.add_argument("--jobs", type=int, default=3, help="JDs ingested before the run")
+    ap.add_argument("--questions", type=int, default=5, help="n for /quiz/start")
+    ap.add_argument("--timeout", type=float, default=120.0, help="per-request timeout (s)")
+    ap.add_argument("--slo-p95-ms", type=float, default=2000.0, help="p95 latency objective per route")
+    ap.add_argument("--slo-error-rate", type=float, default=0.01, help="error-rate objective per route")
+    ap.add_argument("--json", dest="json_out", help="also write the report to this file")
+    spawn = ap.add_argument_group("spawned app (ignored with --base-url)")
+    spawn.add_argument("--port", type=int, default=0)
+    spawn.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    spawn.add_argument("--vector-backend", default="numpy", choices=["numpy", "chroma"])
+    spawn.add_argument("--real-embeddings", action="store_true", help="use MiniLM instead of hash embeddings")
+    spawn.add_argument("--stub-port", type=int, default=0)
+    spawn.add_argument("--stub-latency", type=float, default=0.3, help="seconds before the first token")
+    spawn.add_argument("--stub-jitter", type=float, default=0.1)
+    spawn.add_argument("--stub-token-delay", type=float, default=0.0)
+    spawn.add_argument("--stub-fail-rate", type=float, default=0.0)
+    spawn.add_argument("--stub-concurrency", type=int, default=4, help="router max_concurrency for the stub")
+    args = ap.parse_args()
+
+    levels = [int(x) for x in args.ramp.split(",") if x.strip()]
+    app = None
+    base_url = args.base_url
+    if not base_url:
+        app = SpawnedApp(args)
+        app.wait_ready()
+        base_url = app.base_url
+        print(f"app on {base_url} (workdir {app.tmp})")
+
+    try:
+        job_ids = setup_jobs(base_url, args.jobs, args.timeout)
+        print(f"ingested jobs {job_ids}")
+        # let the background question-bank fill settle so stage 1 isn't measuring it
+        time.sleep(min(5.0, args.stub_latency * 4) if app else 0.0)
+        report = []
+        for users in levels:
+            stage = asyncio.run(run_stage(base_url, users, args.duration, job_ids, args.questions, args.timeout))
+            s = summarize(stage, args.slo_p95_ms, args.slo_error_rate)
+            report.append(s)
+            print_stage(s)
+    finally:
+        if app:
+            app.stop()
+
+    knee = find_knee(report)
+    passing = [s["users"] for s in report if s["slo_ok"]]
+    print("\n== summary")
+    print(f"{'users':>6}{'flows/s':>10}{'flow p95 ms':>13}  SLO")
+    for s in report:
+        print(f"{s['users']:>6}{s['flows_per_s']:>10.2f}{s['flow_p95_ms']:>13.0f}  {'PASS' if s['slo_ok'] else 'FAIL'}")
+    print(f"knee: ~{knee} users" if knee else "knee: not reached in this ramp")
+    print(f"max concurrency meeting SLO (p95 <= {args.slo_p95_ms:.0f} ms, errors <= {100 * args.slo_error_rate:.1f}%): "
+          f"{max(passing) if passing else 'none'}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"stages": report, "knee_users": knee,
+                       "slo": {"p95_ms": args.slo_p95_ms, "error_rate": args.slo_error_rate}}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Minimal Ollama stand-in for local router / load testing.
+
+Serves GET /api/tags and POST /api/chat (streaming NDJSON or single JSON)
+with canned answers shaped like what our skill, quiz and grading prompts expect.
+
+    cd backend
+    python scripts/stub_ollama.py --port 11500 --latency 0.3 --model mistral:latest
+    LLM_BACKENDS='[{"url":"http://127.0.0.1:11500","model":"mistral:latest"}]' uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SKILLS = [
+    {"skill": "Python", "importance": 5, "must_have": True},
+    {"skill": "FastAPI", "importance": 4, "must_have": True},
+    {"skill": "PostgreSQL", "importance": 4, "must_have": False},
+    {"skill": "Docker", "importance": 3, "must_have": False},
+    {"skill": "Kubernetes", "importance": 3, "must_have": False},
+    {"skill": "AWS", "importance": 3, "must_have": False},
+    {"skill": "CI/CD", "importance": 2, "must_have": False},
+]
+
+
+def canned_reply(prompt: str) -> str:
+    if "CANDIDATE ANSWER" in prompt:
+        m = re.search(r"CANDIDATE ANSWER:(.*?)(?:\n\n|$)", prompt, flags=re.S)
+        answer = (m.group(1) if m else "").strip()
+        rel = 4 if len(answer) > 40 else 2
+        return json.dumps({
+            "relevance": rel, "qualification": rel, "communication": 4,
+            "qualified": rel >= 4, "tip": "Quantify scope and outcomes.",
+        })
+    if "self-assessment quiz" in prompt:
+        m = re.search(r"Write (\d+) concise", prompt)
+        n = int(m.group(1)) if m else 5
+        skills = [s["skill"] for s in SKILLS]
+        return json.dumps([
+            {"q": f"How many years have you worked with {skills[i % len(skills)]}? Variant {i + 1}."}
+            for i in range(n)
+        ])
+    return json.dumps(SKILLS)
+
+
+class StubState:
+    def __init__(self, models, latency, jitter, fail_rate, token_delay, chatter=0):
+        self.models = models
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.token_delay = token_delay
+        self.chatter = chatter
+        self.requests = 0
+        self.with_format = 0
+        self.aborted = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, code: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.startswith("/api/tags"):
+                self._json(200, {"models": [{"name": m, "model": m} for m in state.models]})
+            elif self.path.startswith("/stats"):
+                self._json(200, {"requests": state.requests, "with_format": state.with_format,
+                                 "aborted": state.aborted})
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.startswith("/api/chat"):
+                self._json(404, {"error": "not found"})
+                return
+            with state.lock:
+                state.requests += 1
+                state.with_format += 1 if req.get("format") else 0
+            if random.random() < state.fail_rate:
+                self._json(500, {"error": "stub failure"})
+                return
+
+            time.sleep(max(0.0, state.latency + random.uniform(-state.jitter, state.jitter)))
+            prompt = "\n".join(m.get("content", "") for m in req.get("messages", []))
+            reply = canned_reply(prompt)
+            if state.chatter:
+                # what real models do after the JSON: a fenced block + remarks, or (with format)
+                # whitespace padding until num_predict
+                pad = " \n" if req.get("format") else " Let me know if you need anything else."
+                reply = (reply if req.get("format") else f"```json\n{reply}\n```\n") + (pad * state.chatter)[: state.chatter]
+            model = req.get("model", state.models[0])
+            now = datetime.now(timezone.utc).isoformat()
+            final = {
+                "model": model, "created_at": now, "done": True, "done_reason": "stop",
+                "message": {"role": "assistant", "content": ""},
+                "total_duration": 1, "prompt_eval_count": len(prompt) // 4, "eval_count": len(reply) // 4,
+            }
+
+            if not req.get("stream", True):
+                final["message"]["content"] = reply
+                self._json(200, final)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def chunk(obj: dict):
+                data = (json.dumps(obj) + "\n").encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            try:
+                for i in range(0, len(reply), 16):
+                    chunk({"model": model, "created_at": now, "done": False,
+                           "message": {"role": "assistant", "content": reply[i:i + 16]}})
+                    if state.token_delay:
+                        time.sleep(state.token_delay)
+                chunk(final)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # client stopped reading (e.g. early stop) – same as Ollama aborting generation
+                with state.lock:
+                    state.aborted += 1
+
+    return Handler
+
+
+def serve(port: int, models, latency=0.0, jitter=0.0, fail_rate=0.0, token_delay=0.0, host="127.0.0.1", chatter=0):
+    """Start a stub in a daemon thread; returns the server (call .shutdown() to stop)."""
+    state = StubState(models, latency, jitter, fail_rate, token_delay, chatter)
+    srv = ThreadingHTTPServer((host, port), make_handler(state))
+    srv.daemon_threads = True
+    srv.state = state
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11500)
+    ap.add_argument("--model", action="append", help="model name to advertise (repeatable)")
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    ap.add_argument("--jitter", type=float, default=0.0, help="+/- seconds added to latency")
+    ap.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="fraction of chats answered with HTTP 500")
+    ap.add_argument("--chatter", type=int, default=0, help="chars of filler the model keeps generating after the JSON")
+    args = ap.parse_args()
+
+    srv = serve(args.port, args.model or ["mistral:latest"], args.latency, args.jitter,
+                args.fail_rate, args.token_delay, host=args.host, chatter=args.chatter)
+    print(f"stub ollama on http://{args.host}:{args.port} models={args.model or ['mistral:latest']}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()